@@ -0,0 +1,110 @@
+import io
+import warnings
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from ephemeral.config import CONTEXT_PREFIX, IMAGE_JPEG_QUALITY, IMAGE_MAX_EDGE_PX, IMAGE_MAX_PIXELS
+
+
+def prepare_image_for_model(data: bytes, mime_type: str) -> Tuple[bytes, str]:
+    """
+    Return (image_bytes, mime_type) sized for vision models.
+
+    Images whose longest edge exceeds IMAGE_MAX_EDGE_PX are downscaled and
+    re-encoded as JPEG in memory. Smaller images, anything Pillow cannot decode,
+    and images over IMAGE_MAX_PIXELS (or that Pillow flags as a decompression
+    bomb) are returned unchanged so the original upload is never lost.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(data)) as img:
+                if max(img.size) <= IMAGE_MAX_EDGE_PX:
+                    return data, mime_type
+
+                # JPEG can decode at a reduced scale; check the budget against what will load.
+                img.draft(None, (IMAGE_MAX_EDGE_PX, IMAGE_MAX_EDGE_PX))
+                if img.width * img.height > IMAGE_MAX_PIXELS:
+                    return data, mime_type
+
+                # Shrink first so the EXIF rotation copies the small image, not the upload.
+                img.thumbnail((IMAGE_MAX_EDGE_PX, IMAGE_MAX_EDGE_PX))
+                img = ImageOps.exif_transpose(img)
+
+                if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                    # JPEG has no alpha channel; flatten onto white instead of black.
+                    rgba = img.convert("RGBA")
+                    flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+                    flattened.paste(rgba, mask=rgba.getchannel("A"))
+                    img = flattened
+                else:
+                    img = img.convert("RGB")
+
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+                return buf.getvalue(), "image/jpeg"
+    except Exception:
+        return data, mime_type
+
+
+# Uploads decoded locally instead of by Tika. Markup formats (HTML, RTF, XML) are left to
+# Tika so the model gets extracted text rather than raw tags.
+_PLAIN_TEXT_MIME_TYPES = frozenset(
+    {
+        "text/plain",
+        "text/csv",
+        "text/markdown",
+        "text/x-markdown",
+        "application/json",
+        "application/yaml",
+        "application/x-yaml",
+        "text/yaml",
+        "text/x-yaml",
+    }
+)
+
+# UTF-16/32 byte-order marks; such files go to Tika, which detects their encoding.
+_WIDE_BOMS = (b"\xff\xfe", b"\xfe\xff")
+
+
+def is_plain_text_upload(mime_type: str) -> bool:
+    """True for uploads whose bytes may be readable text that needs no Tika parse."""
+    return (mime_type or "").split(";", 1)[0].strip().lower() in _PLAIN_TEXT_MIME_TYPES
+
+
+def decode_plain_text(data: bytes) -> Optional[str]:
+    """
+    Decode a plain-text upload locally, matching the stripped text Tika would return.
+
+    Only strict UTF-8 (with or without a byte-order mark) is decoded here. UTF-16/32
+    files and anything that is not valid UTF-8 (e.g. cp1252 CSVs) return None so the
+    caller can hand them to Tika's charset detection instead of garbling characters.
+    """
+    if data.startswith(_WIDE_BOMS):
+        return None
+    try:
+        return data.decode("utf-8-sig").strip()
+    except UnicodeDecodeError:
+        return None
+
+
+def build_doc_context(entries: List[dict]) -> str:
+    """
+    Build the synthetic document context text from ordered {"name", "text"} entries.
+
+    Headers and extracted text are written straight into one buffer, so each
+    document's text is copied once instead of first into a per-document block.
+    Returns an empty string when there are no entries.
+    """
+    if not entries:
+        return ""
+
+    buf = io.StringIO()
+    buf.write(CONTEXT_PREFIX)
+    for i, entry in enumerate(entries):
+        if i:
+            buf.write("\n\n")
+        buf.write(f"--- {entry['name']} ---\n")
+        buf.write(entry["text"])
+    return buf.getvalue()
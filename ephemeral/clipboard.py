@@ -4,34 +4,8 @@ from html import escape as html_escape
 import streamlit as st
 
 
-def _normalize_id(raw_id: str) -> str:
-    return "".join(ch if (ch.isalnum() or ch in "-_") else "-" for ch in raw_id)
-
-
-def _render_copy_iframe(
-    *,
-    button_id: str,
-    plain_id: str,
-    rich_id: str,
-    button_markup: str,
-    hover_css: str,
-    button_css: str,
-    active_css: str,
-    copied_css: str,
-    failed_css: str,
-    extra_css: str,
-    export_text_plain: str,
-    export_html: str,
-    success_label: str,
-    success_flash_ms: int,
-    failure_label: str,
-    failure_flash_ms: int,
-    restore_mode: str,
-    height: int,
-) -> None:
-    safe_plain = html_escape(export_text_plain)
-
-    iframe_html = f"""
+# Static copy-button document; filled in with str.format for each render.
+_COPY_IFRAME_TEMPLATE = """
         <meta charset=\"utf-8\" />
         <style>
           html, body {{
@@ -184,9 +158,65 @@ def _render_copy_iframe(
           }});
         </script>
         """
+
+
+def _normalize_id(raw_id: str) -> str:
+    return "".join(ch if (ch.isalnum() or ch in "-_") else "-" for ch in raw_id)
+
+
+def _render_copy_iframe(
+    *,
+    button_id: str,
+    plain_id: str,
+    rich_id: str,
+    button_markup: str,
+    hover_css: str,
+    button_css: str,
+    active_css: str,
+    copied_css: str,
+    failed_css: str,
+    extra_css: str,
+    export_text_plain: str,
+    export_html: str,
+    success_label: str,
+    success_flash_ms: int,
+    failure_label: str,
+    failure_flash_ms: int,
+    restore_mode: str,
+    height: int,
+) -> None:
+    # Reruns re-render every copy button; reuse the encoded document while its payload is unchanged.
+    iframe_cache = st.session_state.setdefault("_copy_iframe_srcs", {})
+    cached = iframe_cache.get(button_id)
+    if cached is not None and cached[0] == export_text_plain and cached[1] == export_html:
+        st.iframe(cached[2], height=height, width="stretch")
+        return
+
+    safe_plain = html_escape(export_text_plain)
+
+    iframe_html = _COPY_IFRAME_TEMPLATE.format(
+        extra_css=extra_css,
+        button_id=button_id,
+        button_css=button_css,
+        hover_css=hover_css,
+        active_css=active_css,
+        copied_css=copied_css,
+        failed_css=failed_css,
+        button_markup=button_markup,
+        plain_id=plain_id,
+        safe_plain=safe_plain,
+        rich_id=rich_id,
+        export_html=export_html,
+        restore_mode=restore_mode,
+        success_label=success_label,
+        success_flash_ms=success_flash_ms,
+        failure_label=failure_label,
+        failure_flash_ms=failure_flash_ms,
+    )
     iframe_src = "data:text/html;charset=utf-8;base64," + base64.b64encode(
         iframe_html.encode("utf-8")
     ).decode("ascii")
+    iframe_cache[button_id] = (export_text_plain, export_html, iframe_src)
     st.iframe(iframe_src, height=height, width="stretch")
 
 
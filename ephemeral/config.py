@@ -9,9 +9,12 @@ CONTEXT_PREFIX = "Context:\n"
 
 # TTL for session-scoped Tika parse cache (seconds)
 TIKA_CACHE_TTL_S = 3600
+TIKA_CACHE_MAX_ENTRIES = 32
 
 # Token estimation behavior
 TOKEN_HEURISTIC_CHARS_PER_TOKEN = 3.5
+# Optimistic ceiling on characters per token, used only to reject text that cannot fit at all.
+TOKEN_MAX_CHARS_PER_TOKEN = 12
 TOKEN_CACHE_MAX_ENTRIES = 256
 TOKENIZE_TIMEOUT_S = 2.0  # keep UI snappy; budgeting degrades silently if tokenize is slow/unavailable
 
@@ -76,6 +79,11 @@ def _bool_env(name: str, default: bool = False) -> bool:
 
 
 TIKA_TIMEOUT_S = _int_env("TIKA_TIMEOUT_S", 15)
+# Process-wide cap on in-flight calls to each backend (Tika parses, Ollama /api/tokenize),
+# shared by every session; Tika answers 503 when overloaded. TIKA_MAX_PARALLEL is how many
+# parses one upload batch starts at once, still within this cap.
+MAX_CONCURRENT = max(1, _int_env("EPHEMERAL_MAX_CONCURRENT", 4))
+TIKA_MAX_PARALLEL = max(1, _int_env("TIKA_MAX_PARALLEL", MAX_CONCURRENT))
 LLM_CONTEXT_TOKENS = _int_env_optional("LLM_CONTEXT_TOKENS")
 LLM_OUTPUT_RESERVE_TOKENS = _int_env("LLM_OUTPUT_RESERVE_TOKENS", 32768)
 LLM_REQUEST_TIMEOUT_S = _float_env("LLM_REQUEST_TIMEOUT_S", 1800.0)
@@ -88,6 +96,12 @@ LLM_THINKING_EFFORT = os.getenv("LLM_THINKING_EFFORT", "high").strip() or "high"
 LLM_SHOW_REASONING = _bool_env("LLM_SHOW_REASONING", False)
 LLM_MAX_TOKENS = _int_env_optional("LLM_MAX_TOKENS")
 IMG_TOKEN_COST_DEFAULT = _int_env("IMG_TOKEN_COST_DEFAULT", 2048)
+# Longest image edge kept in session state and sent to the model; larger uploads are downscaled.
+IMAGE_MAX_EDGE_PX = _int_env("IMAGE_MAX_EDGE_PX", 1568)
+IMAGE_JPEG_QUALITY = 85
+# Decoded-pixel budget for downscaling (about 75 MB as RGB). Larger uploads are kept as-is
+# rather than decoded in full on the shared image worker pool.
+IMAGE_MAX_PIXELS = 25_000_000
 
 
 def _ollama_base_url() -> str:
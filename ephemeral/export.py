@@ -1,13 +1,41 @@
+import io
 import re
 from html import escape as html_escape
-from typing import List, Tuple, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
 from ephemeral.config import CONTEXT_PREFIX
-
-
-def build_message_text(messages: List[dict]) -> str:
-    """Flatten message content into text for token estimation."""
-    chunks: List[str] = []
+from ephemeral.message_memo import message_memo
+
+# (doc_lines, img_lines, message_text) extracted from one message's content.
+ExportInfo = Tuple[List[str], List[str], str]
+
+# Legacy attachment marker prefixes ("📄 *name*" / "📷 *name*"), keyed to their kind.
+_MARKER_PREFIX_LEN = 3
+_MARKER_KINDS = {"📄 *": "doc", "📷 *": "img"}
+
+# Content part types that carry an image (raw bytes or a data URL).
+_IMAGE_PART_TYPES = frozenset({"image", "image_url"})
+
+# Precompiled patterns for context parsing and the basic Markdown-to-HTML converter.
+_RE_CTX_SPLIT = re.compile(r"(?m)^---\s*(.+?)\s*---\s*$")
+# Classifies one non-blank Markdown line in a single match; lastgroup names the block kind
+# (horizontal rule, heading or list item) and no match means paragraph text.
+_RE_BLOCK_LINE = re.compile(
+    r"^\s*(?:"
+    r"(?P<hr>(?:---|\*\*\*|___)\s*$)"
+    r"|(?P<heading>(?P<hashes>#{1,6})\s+(?P<title>\S.*?)\s*$)"
+    r"|(?P<item>(?:(?P<bullet>[-*•])|\d+\.)\s+(?P<item_text>.*)$)"
+    r")"
+)
+_RE_CODE = re.compile(r"`([^`]+)`")
+_RE_BOLD = re.compile(r"\*\*([^*]+)\*\*")
+_RE_EM = re.compile(r"(?<!\*)\*([^*]+)\*(?!\*)")
+# Any line that could start a heading, list item or rule; text without one is plain paragraphs.
+_RE_BLOCK_MARKER = re.compile(r"(?m)^\s*[-*•#_\d]")
+
+
+def _iter_message_texts(messages: List[dict]) -> Iterator[str]:
+    """Yield the non-empty text of each message (text parts only for multi-part content)."""
     for msg in messages:
         content = msg.get("content", "")
         if isinstance(content, list):
@@ -15,14 +43,17 @@ def build_message_text(messages: List[dict]) -> str:
                 if part.get("type") == "text":
                     text = part.get("text")
                     if text:
-                        chunks.append(text)
-        else:
-            if content:
-                chunks.append(str(content))
-    return "\n".join(chunks)
+                        yield text
+        elif content:
+            yield content if isinstance(content, str) else str(content)
+
+
+def build_message_text(messages: List[dict]) -> str:
+    """Flatten message content into text for token estimation."""
+    return "\n".join(_iter_message_texts(messages))
 
 
-def _extract_export_info(content: Union[str, list]) -> Tuple[List[str], List[str], str]:
+def _extract_export_info(content: Union[str, list]) -> ExportInfo:
     """
     Extract (doc_lines, img_lines, message_text) from message content.
 
@@ -39,7 +70,6 @@ def _extract_export_info(content: Union[str, list]) -> Tuple[List[str], List[str
 
     doc_seen = set()
     img_seen = set()
-    img_marker_names: List[str] = []
 
     for part in content:
         ptype = part.get("type")
@@ -48,8 +78,8 @@ def _extract_export_info(content: Union[str, list]) -> Tuple[List[str], List[str
             text = part.get("text", "")
 
             if part.get("_synthetic"):
-                ctx = text[len(CONTEXT_PREFIX) :] if text.startswith(CONTEXT_PREFIX) else text
-                blocks = re.split(r"(?m)^---\s*(.+?)\s*---\s*$", ctx)
+                ctx = text.removeprefix(CONTEXT_PREFIX)
+                blocks = _RE_CTX_SPLIT.split(ctx)
                 for i in range(1, len(blocks), 2):
                     fname = (blocks[i] or "").strip()
                     extracted = blocks[i + 1] if i + 1 < len(blocks) else ""
@@ -58,60 +88,64 @@ def _extract_export_info(content: Union[str, list]) -> Tuple[List[str], List[str
                         doc_seen.add(fname)
                         doc_lines.append(f"- 📄 {fname} ({char_count:,} characters extracted)")
 
-            elif text.startswith("📄 *") and text.endswith("*"):
-                fname = text[len("📄 *") : -1].strip()
-                if fname and fname not in doc_seen:
-                    doc_seen.add(fname)
-                    doc_lines.append(f"- 📄 {fname}")
-
-            elif text.startswith("📷 *") and text.endswith("*"):
-                fname = text[len("📷 *") : -1].strip()
-                if fname:
-                    img_marker_names.append(fname)
-
             else:
-                if text and text.strip():
-                    text_chunks.append(text.strip())
-
-        elif ptype == "image":
-            fname = (part.get("filename") or "image").strip()
-            if fname and fname not in img_seen:
-                img_seen.add(fname)
-                img_lines.append(f"- 📷 {fname}")
-
-        elif ptype == "image_url":
+                marker_kind = _MARKER_KINDS.get(text[:_MARKER_PREFIX_LEN]) if text.endswith("*") else None
+                if marker_kind == "doc":
+                    fname = text[_MARKER_PREFIX_LEN:-1].strip()
+                    if fname and fname not in doc_seen:
+                        doc_seen.add(fname)
+                        doc_lines.append(f"- 📄 {fname}")
+                elif marker_kind == "img":
+                    fname = text[_MARKER_PREFIX_LEN:-1].strip()
+                    if fname and fname not in img_seen:
+                        img_seen.add(fname)
+                        img_lines.append(f"- 📷 {fname}")
+                else:
+                    stripped = text.strip()
+                    if stripped:
+                        text_chunks.append(stripped)
+
+        elif ptype in _IMAGE_PART_TYPES:
             fname = (part.get("filename") or "image").strip()
             if fname and fname not in img_seen:
                 img_seen.add(fname)
                 img_lines.append(f"- 📷 {fname}")
 
-    for fname in img_marker_names:
-        if fname not in img_seen:
-            img_seen.add(fname)
-            img_lines.append(f"- 📷 {fname}")
-
     message_text = "\n\n".join(text_chunks).strip()
     return doc_lines, img_lines, message_text
 
 
-def build_conversation_markdown(messages: List[dict]) -> str:
-    """Build a Markdown transcript used as plain-text clipboard fallback."""
-    lines: List[str] = ["# EphemerAl Conversation", ""]
+def _assemble_conversation_markdown(blocks: List[str]) -> str:
+    """Join per-message transcript blocks under the Markdown transcript title."""
+    buf = io.StringIO()
+    buf.write("# EphemerAl Conversation\n")
+    for block in blocks:
+        buf.write("\n")
+        buf.write(block)
+    return buf.getvalue().rstrip() + "\n"
 
-    for msg in messages:
-        lines.extend(_build_message_markdown_lines(msg))
-        lines.append("---")
-        lines.append("")
 
-    return "\n".join(lines).rstrip() + "\n"
+def _transcript_markdown_block(lines: List[str]) -> str:
+    """Render one message's Markdown lines as a transcript block ending in a rule."""
+    return "\n".join([*lines, "---", ""])
+
+
+def build_conversation_markdown(messages: List[dict]) -> str:
+    """Build a Markdown transcript used as plain-text clipboard fallback."""
+    return _assemble_conversation_markdown(
+        [_transcript_markdown_block(_build_message_markdown_lines(msg)) for msg in messages]
+    )
 
 
 def _inline_md_to_html(text: str) -> str:
     """Minimal inline Markdown -> HTML for clipboard friendliness."""
     t = html_escape(text)
-    t = re.sub(r"`([^`]+)`", r"<code>\1</code>", t)
-    t = re.sub(r"\*\*([^*]+)\*\*", r"<strong>\1</strong>", t)
-    t = re.sub(r"(?<!\*)\*([^*]+)\*(?!\*)", r"<em>\1</em>", t)
+    # Most lines carry no inline markup; a substring check skips the regex scans.
+    if "`" in t:
+        t = _RE_CODE.sub(r"<code>\1</code>", t)
+    if "*" in t:
+        t = _RE_BOLD.sub(r"<strong>\1</strong>", t)
+        t = _RE_EM.sub(r"<em>\1</em>", t)
     return t
 
 
@@ -132,10 +166,9 @@ def _md_block_to_html(md_block: str) -> str:
         return leading_spaces // 2
 
     def flush_para() -> None:
-        nonlocal para
         if para:
             out.append("<p>" + "<br>".join(para) + "</p>")
-            para = []
+            para.clear()
 
     def close_lists(target_depth: int = 0) -> None:
         while len(list_stack) > target_depth:
@@ -172,34 +205,23 @@ def _md_block_to_html(md_block: str) -> str:
         line = raw or ""
         stripped = line.strip()
 
-        if stripped == "":
+        if not stripped:
             flush_para()
             continue
 
-        if stripped in {"---", "***", "___"}:
+        m = _RE_BLOCK_LINE.match(line)
+        if m is not None:
             flush_para()
+            kind = m.lastgroup
+            if kind == "item":
+                append_list_item(line, "ul" if m.group("bullet") else "ol", m.group("item_text"))
+                continue
             close_lists()
-            out.append("<hr>")
-            continue
-
-        m = re.match(r"^(#{1,6})\s+(.*)$", stripped)
-        if m:
-            flush_para()
-            close_lists()
-            level = len(m.group(1))
-            out.append(f"<h{level}>" + _inline_md_to_html(m.group(2)) + f"</h{level}>")
-            continue
-
-        m = re.match(r"^\s*[-*•]\s+(.*)$", line)
-        if m:
-            flush_para()
-            append_list_item(line, "ul", m.group(1))
-            continue
-
-        m = re.match(r"^\s*\d+\.\s+(.*)$", line)
-        if m:
-            flush_para()
-            append_list_item(line, "ol", m.group(1))
+            if kind == "hr":
+                out.append("<hr>")
+            else:
+                level = len(m.group("hashes"))
+                out.append(f"<h{level}>" + _inline_md_to_html(m.group("title")) + f"</h{level}>")
             continue
 
         close_lists()
@@ -210,9 +232,29 @@ def _md_block_to_html(md_block: str) -> str:
     return "\n".join(out)
 
 
+def _paragraphs_to_html(md: str) -> str:
+    """Render marker-free text as <p> blocks; same output as _md_block_to_html for such text."""
+    paragraphs: List[str] = []
+    para: List[str] = []
+    for line in md.split("\n"):
+        stripped = line.strip()
+        if stripped:
+            para.append(_inline_md_to_html(stripped))
+        elif para:
+            paragraphs.append("<p>" + "<br>".join(para) + "</p>")
+            para = []
+    if para:
+        paragraphs.append("<p>" + "<br>".join(para) + "</p>")
+    return "\n".join(paragraphs)
+
+
 def _md_to_html_basic(md: str) -> str:
     """Minimal Markdown -> HTML converter for copy/paste purposes."""
     md = (md or "").replace("\r\n", "\n")
+    # Plain prose (no fences, headings, lists or rules) skips the block parser.
+    if "```" not in md and not _RE_BLOCK_MARKER.search(md):
+        return _paragraphs_to_html(md)
+
     parts = md.split("```")
     out: List[str] = []
 
@@ -228,25 +270,38 @@ def _md_to_html_basic(md: str) -> str:
     return "\n".join(out).strip()
 
 
+def _assemble_conversation_html(message_html: List[str]) -> str:
+    """Wrap per-message HTML in the rich transcript container."""
+    buf = io.StringIO()
+    buf.write("<div>\n<p><strong>EphemerAl Conversation</strong></p>\n")
+    for html in message_html:
+        buf.write(html)
+        buf.write("\n<hr>\n")
+    buf.write("</div>")
+    return buf.getvalue().strip()
+
+
 def build_conversation_html(messages: List[dict]) -> str:
     """Rich transcript as HTML for clipboard copy."""
-    chunks: List[str] = ["<div>", "<p><strong>EphemerAl Conversation</strong></p>"]
+    return _assemble_conversation_html([build_message_html(msg) for msg in messages])
 
-    for msg in messages:
-        chunks.append(build_message_html(msg))
-        chunks.append("<hr>")
 
-    chunks.append("</div>")
-    return "\n".join(chunks).strip()
+def _message_export_info(message: dict) -> ExportInfo:
+    """Extract (doc_lines, img_lines, message_text) for one message."""
+    content = message.get("content", "")
+    # Plain assistant/user replies are strings; they carry no attachments to scan for.
+    if isinstance(content, str):
+        return [], [], content
+    return _extract_export_info(content)
 
 
-def _build_message_markdown_lines(message: dict) -> List[str]:
-    """Build Markdown lines for a single message export."""
+def _build_message_markdown_lines(message: dict, info: Optional[ExportInfo] = None) -> List[str]:
+    """Build Markdown lines for a single message export, reusing extracted info when given."""
     role = message.get("role", "assistant")
     role_title = "User" if role == "user" else "Assistant"
     lines: List[str] = [f"**{role_title}**"]
 
-    doc_lines, img_lines, message_text = _extract_export_info(message.get("content", ""))
+    doc_lines, img_lines, message_text = info if info is not None else _message_export_info(message)
 
     if doc_lines or img_lines:
         lines.append("")
@@ -267,14 +322,14 @@ def build_message_markdown(message: dict) -> str:
     return "\n".join(_build_message_markdown_lines(message)).strip() + "\n"
 
 
-def build_message_html(message: dict) -> str:
-    """Build clipboard-friendly HTML for one message turn."""
+def build_message_html(message: dict, info: Optional[ExportInfo] = None) -> str:
+    """Build clipboard-friendly HTML for one message turn, reusing extracted info when given."""
     chunks: List[str] = []
     role = message.get("role", "assistant")
     role_title = "User" if role == "user" else "Assistant"
     chunks.append(f"<p><strong>{html_escape(role_title)}</strong></p>")
 
-    doc_lines, img_lines, message_text = _extract_export_info(message.get("content", ""))
+    doc_lines, img_lines, message_text = info if info is not None else _message_export_info(message)
 
     if doc_lines or img_lines:
         chunks.append("<p><strong>Attachments:</strong></p>")
@@ -288,3 +343,41 @@ def build_message_html(message: dict) -> str:
         chunks.append(_md_to_html_basic(message_text))
 
     return "\n".join(chunks).strip()
+
+
+def _build_message_exports(message: dict) -> Tuple[str, str, str]:
+    # Attachment/context extraction runs once and feeds both formats.
+    info = _message_export_info(message)
+    lines = _build_message_markdown_lines(message, info)
+    return (
+        "\n".join(lines).strip() + "\n",
+        build_message_html(message, info),
+        _transcript_markdown_block(lines),
+    )
+
+
+def _message_exports(message: dict) -> Tuple[str, str, str]:
+    """Return (turn_markdown, html, transcript_markdown_block) for one message, built once."""
+    return message_memo(message, "export", _build_message_exports)
+
+
+def cached_message_exports(message: dict) -> Tuple[str, str]:
+    """Return memoized (markdown, html) copy payloads for one message turn."""
+    turn_md, turn_html, _ = _message_exports(message)
+    return turn_md, turn_html
+
+
+def cached_conversation_exports(messages: List[dict]) -> Tuple[str, str]:
+    """
+    Return (markdown, html) transcripts from memoized per-message exports.
+
+    Only messages appended since the last call are rendered; earlier ones reuse
+    their stored blocks, so a rerun costs one join instead of a full re-export.
+    """
+    md_blocks: List[str] = []
+    html_blocks: List[str] = []
+    for msg in messages:
+        _, msg_html, md_block = _message_exports(msg)
+        md_blocks.append(md_block)
+        html_blocks.append(msg_html)
+    return _assemble_conversation_markdown(md_blocks), _assemble_conversation_html(html_blocks)
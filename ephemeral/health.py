@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+from ephemeral.http_session import get_http_session
+from ephemeral.llm_client import probe_llm
+from ephemeral.tika_client import probe_tika
+from ephemeral.ttl_cache import ttl_memo
+
+
+@ttl_memo(5)
+def backends_alive() -> Tuple[bool, bool]:
+    """
+    Return (llm_ok, tika_ok) for the sidebar status messages.
+
+    The two probes are independent network waits, so they run concurrently and a
+    cold check costs the slower probe rather than the sum of both.
+    """
+    # Resolve the shared session here; worker threads have no Streamlit script context.
+    session = get_http_session()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        llm_future = executor.submit(probe_llm, session)
+        tika_future = executor.submit(probe_tika, session)
+        return llm_future.result(), tika_future.result()
@@ -0,0 +1,26 @@
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# ── Shared HTTP session ───────────────────────────────────────────
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """
+    Return a process-wide requests.Session with pooled keep-alive connections.
+
+    Health probes and metadata calls run on most Streamlit reruns; reusing sockets
+    avoids a fresh TCP handshake to Ollama/Tika on every probe.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        # Retry a failed connect once, but never re-send a request the server may
+        # already be working on (a slow Tika parse would otherwise run twice).
+        max_retries=Retry(total=1, read=0, backoff_factor=0.1),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
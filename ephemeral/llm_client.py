@@ -1,12 +1,12 @@
 import hashlib
 import logging
 import re
+import threading
 from collections import OrderedDict
-from typing import Dict, Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
 
 import streamlit as st
-import requests
-from openai import OpenAI
 
 from ephemeral.config import (
     ENABLE_TOKEN_BUDGETING,
@@ -17,42 +17,80 @@ from ephemeral.config import (
     LLM_MODEL_NAME,
     LLM_REQUEST_TIMEOUT_S,
     LLM_SUPPORTS_VISION,
+    MAX_CONCURRENT,
     TOKEN_CACHE_MAX_ENTRIES,
     TOKENIZE_TIMEOUT_S,
     _ollama_base_url,
 )
+from ephemeral.http_session import get_http_session
 from ephemeral.token_budget import _heuristic_token_estimate
+from ephemeral.ttl_cache import ttl_memo
 
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-@st.cache_data(ttl=5, show_spinner=False)
-def llm_alive() -> bool:
-    """
-    Lightweight health check for the LLM backend.
-    Tries OpenAI-compatible /models endpoint first, then falls back to Ollama /api/tags.
-    Treats 401/403 as "alive" since auth errors prove the service is reachable.
-    """
-    try:
-        base_url = LLM_BASE_URL.rstrip("/")
+# /api/show fields the app reads. The rest (license, modelfile, template, ...) can be
+# large and is dropped right after decoding.
+_SHOW_FIELDS = ("capabilities", "model_info", "parameters")
 
-        if base_url.endswith("/v1"):
-            models_url = base_url + "/models"
-        else:
-            models_url = base_url + "/v1/models"
+# model_info keys that indicate a vision encoder/projector is bundled with the model.
+_VISION_KEY_RE = re.compile(r"vision|clip|projector", re.IGNORECASE)
+# Context size set in the model's Modelfile parameters block.
+_RE_NUM_CTX = re.compile(r"\bnum_ctx\s+(\d+)")
 
-        r = requests.get(models_url, timeout=2)
-        if r.status_code in (200, 401, 403):
-            return True
 
-        r2 = requests.get(_ollama_base_url() + "/api/tags", timeout=2)
-        return r2.ok
-    except Exception:
-        return False
+# Health-probe endpoints, derived once from the configured base URL.
+_LLM_BASE = LLM_BASE_URL.rstrip("/")
+_MODELS_URL = _LLM_BASE + ("/models" if _LLM_BASE.endswith("/v1") else "/v1/models")
+_OLLAMA_TAGS_URL = _ollama_base_url() + "/api/tags"
+_LLM_PROBE_URLS = (_MODELS_URL, _OLLAMA_TAGS_URL)
+
+# Endpoint that answered the last successful probe; tried first next time.
+_last_healthy_url: Optional[str] = None
+
+
+def _llm_url_ok(session, url: str) -> bool:
+    """Probe one LLM endpoint. 401/403 on /models count as alive (the service is reachable)."""
+    r = session.get(url, timeout=2)
+    if url == _MODELS_URL:
+        return r.status_code in (200, 401, 403)
+    return r.ok
+
+
+def probe_llm(session) -> bool:
+    """
+    Uncached LLM health probe using the given session.
+    Tries OpenAI-compatible /models endpoint first, then falls back to Ollama /api/tags.
+    Once an endpoint answers it is probed first, so a healthy backend costs one GET.
+    """
+    global _last_healthy_url
+
+    preferred = _last_healthy_url
+    urls = _LLM_PROBE_URLS
+    if preferred is not None:
+        urls = (preferred,) + tuple(url for url in _LLM_PROBE_URLS if url != preferred)
+
+    for url in urls:
+        try:
+            if _llm_url_ok(session, url):
+                _last_healthy_url = url
+                return True
+        except Exception:
+            # Both endpoints share a host; a connection error means neither will answer.
+            break
+
+    _last_healthy_url = None
+    return False
 
 
 # ── Cached OpenAI client ──────────────────────────────────────────
 @st.cache_resource
-def get_llm_client() -> OpenAI:
+def get_llm_client() -> "OpenAI":
     """Return a cached OpenAI client instance configured for the backend."""
+    # Imported on first use: the SDK (and its pydantic/httpx stack) is only needed to chat,
+    # not to render the page or run health checks.
+    from openai import OpenAI
+
     return OpenAI(
         base_url=LLM_BASE_URL,
         api_key="not-needed",
@@ -62,52 +100,126 @@ def get_llm_client() -> OpenAI:
 
 
 # ── Ollama model metadata ─────────────────────────────────────────
-@st.cache_data(ttl=60, show_spinner=False)
 def _ollama_show() -> Optional[Dict]:
-    """Cached wrapper for Ollama /api/show. Returns JSON dict on success, else None."""
+    """
+    Uncached Ollama /api/show call. Returns the JSON fields the app uses on
+    success, else None.
+    """
     try:
         show_url = f"{_ollama_base_url()}/api/show"
-        resp = requests.post(show_url, json={"model": LLM_MODEL_NAME}, timeout=2)
+        resp = get_http_session().post(show_url, json={"model": LLM_MODEL_NAME}, timeout=2)
         if resp.ok:
-            return resp.json()
+            payload = resp.json()
+            return {key: payload[key] for key in _SHOW_FIELDS if key in payload}
     except Exception as e:
         logging.debug("Ollama /api/show probe failed: %s", e)
     return None
 
 
-@st.cache_data(ttl=60, show_spinner=False)
-def model_supports_images() -> bool:
-    """
-    Return True if the configured model appears to support vision inputs.
+@dataclass(frozen=True, slots=True)
+class _ModelMeta:
+    """Model capabilities derived from one /api/show payload; known is False when it failed."""
 
-    Uses:
-      1) LLM_SUPPORTS_VISION env var if provided.
-      2) Ollama /api/show capabilities (preferred).
-      3) Ollama model_info heuristics as a fallback.
-    """
-    if LLM_SUPPORTS_VISION is not None:
-        return LLM_SUPPORTS_VISION.strip().lower() in {"1", "true", "yes", "y", "on"}
+    known: bool = False
+    supports_vision: bool = False
+    ctx: Optional[int] = None
+    img_tokens: int = IMG_TOKEN_COST_DEFAULT
 
-    payload = _ollama_show()
+
+def _int_value(value) -> Optional[int]:
+    """Return value as an int if it is an int or a digit string, else None."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _parse_model_meta(payload: Optional[Dict]) -> _ModelMeta:
+    """Fold vision support, context size and image cost out of /api/show in one pass."""
     if not payload:
-        return False
+        return _ModelMeta()
 
     capabilities = payload.get("capabilities")
-    if isinstance(capabilities, list) and "vision" in capabilities:
-        return True
+    supports_vision = isinstance(capabilities, list) and "vision" in capabilities
+
+    ctx: Optional[int] = None
+    parameters = payload.get("parameters")
+    if isinstance(parameters, str):
+        match = _RE_NUM_CTX.search(parameters)
+        if match:
+            ctx = int(match.group(1))
 
     model_info = payload.get("model_info") or {}
-    for key in model_info.keys():
+    if ctx is None:
+        for key in ("num_ctx", "context_length"):
+            ctx = _int_value(model_info.get(key))
+            if ctx is not None:
+                break
+
+    suffix_ctx: Optional[int] = None
+    img_tokens: Optional[int] = None
+    for key, value in model_info.items():
         if not isinstance(key, str):
             continue
-        key_lower = key.lower()
-        if "vision" in key_lower or "clip" in key_lower or "projector" in key_lower:
-            return True
+        if not supports_vision and _VISION_KEY_RE.search(key):
+            supports_vision = True
+        if suffix_ctx is None and key.endswith(".context_length"):
+            suffix_ctx = _int_value(value)
+        if img_tokens is None and key.endswith("mm.tokens_per_image"):
+            img_tokens = _int_value(value)
+
+    return _ModelMeta(
+        known=True,
+        supports_vision=supports_vision,
+        ctx=ctx if ctx is not None else suffix_ctx,
+        img_tokens=img_tokens if img_tokens is not None else IMG_TOKEN_COST_DEFAULT,
+    )
+
+
+@ttl_memo(5)
+def _fetched_model_meta() -> _ModelMeta:
+    """One /api/show fetch and parse, held briefly so a failure is not re-probed on every rerun."""
+    return _parse_model_meta(_ollama_show())
 
-    return False
+
+@ttl_memo(60)
+def _cached_model_meta() -> _ModelMeta:
+    return _fetched_model_meta()
+
+
+def _model_meta() -> _ModelMeta:
+    """
+    Model capabilities, refreshed at most once a minute per process.
+
+    /api/show is fetched and parsed once for all three getters. The immutable result is
+    shared as-is, so cache hits skip the copy st.cache_data makes on every read. A failed
+    /api/show is not held for the minute, only for the 5 s of _fetched_model_meta, so the
+    backend is asked again soon without every rerun and getter re-probing it.
+    """
+    meta = _cached_model_meta()
+    if not meta.known:
+        _cached_model_meta.clear()
+    return meta
+
+
+def model_supports_images() -> Optional[bool]:
+    """
+    Return True if the configured model appears to support vision inputs.
+
+    Uses:
+      1) LLM_SUPPORTS_VISION env var if provided.
+      2) Ollama /api/show capabilities (preferred).
+      3) Ollama model_info heuristics as a fallback.
+
+    Returns None when /api/show could not be read, so callers do not persist a guess.
+    """
+    if LLM_SUPPORTS_VISION is not None:
+        return LLM_SUPPORTS_VISION.strip().lower() in {"1", "true", "yes", "y", "on"}
+    meta = _model_meta()
+    return meta.supports_vision if meta.known else None
 
 
-@st.cache_data(ttl=60, show_spinner=False)
 def get_model_ctx() -> Optional[int]:
     """
     Return model context tokens for app-side budgeting.
@@ -118,57 +230,12 @@ def get_model_ctx() -> Optional[int]:
     """
     if LLM_CONTEXT_TOKENS:
         return LLM_CONTEXT_TOKENS
+    return _model_meta().ctx
 
-    payload = _ollama_show()
-    if not payload:
-        return None
 
-    parameters = payload.get("parameters")
-    if isinstance(parameters, str):
-        match = re.search(r"\bnum_ctx\s+(\d+)", parameters)
-        if match:
-            try:
-                return int(match.group(1))
-            except Exception:
-                pass
-
-    model_info = payload.get("model_info") or {}
-
-    for key in ("num_ctx", "context_length"):
-        value = model_info.get(key)
-        if isinstance(value, int):
-            return value
-        if isinstance(value, str) and value.isdigit():
-            return int(value)
-
-    for key, value in model_info.items():
-        if isinstance(key, str) and key.endswith(".context_length"):
-            if isinstance(value, int):
-                return value
-            if isinstance(value, str) and value.isdigit():
-                return int(value)
-
-    return None
-
-
-@st.cache_data(ttl=60, show_spinner=False)
 def get_image_token_cost() -> int:
     """Return tokens-per-image if provided by model metadata, else default."""
-    payload = _ollama_show()
-    if not payload:
-        return IMG_TOKEN_COST_DEFAULT
-
-    model_info = payload.get("model_info") or {}
-    for key, value in model_info.items():
-        if not isinstance(key, str):
-            continue
-        if key.endswith("mm.tokens_per_image"):
-            if isinstance(value, int):
-                return value
-            if isinstance(value, str) and value.isdigit():
-                return int(value)
-
-    return IMG_TOKEN_COST_DEFAULT
+    return _model_meta().img_tokens
 
 
 # ── Token counting ────────────────────────────────────────────────
@@ -198,21 +265,33 @@ def _cache_put(cache: OrderedDict, key: str, value: int) -> None:
             cache.popitem(last=False)
 
 
+# Below this length the heuristic is used directly; a tokenize round-trip (and a cache slot)
+# is not worth it for a handful of tokens.
+_SHORT_TEXT_CHARS = 64
+
+# Process-wide cap on in-flight /api/tokenize calls across all sessions.
+_TOKENIZE_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+
 def count_text_tokens(text: str) -> int:
     """
     Best-effort token count for text.
 
     If ENABLE_TOKEN_BUDGETING is on, we try Ollama /api/tokenize.
     If unavailable or slow, we silently fall back to a heuristic.
+    Short text always uses the heuristic.
 
     UX rule: this function must not show user-facing warnings.
     """
     if not text:
         return 0
+    if len(text) < _SHORT_TEXT_CHARS:
+        return _heuristic_token_estimate(text)
 
     cache = _get_token_cache()
 
-    key = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+    # Cache key only; BLAKE2b is faster than SHA-256 and needs no extra dependency.
+    key = hashlib.blake2b(text.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
     if key in cache:
         cache.move_to_end(key)
         return cache[key]
@@ -227,9 +306,14 @@ def count_text_tokens(text: str) -> int:
         _cache_put(cache, key, n)
         return n
 
+    # Wait no longer than a tokenize call would; when every slot stays busy, fall back to
+    # the heuristic without caching it or marking the tokenizer unavailable.
+    if not _TOKENIZE_SLOTS.acquire(timeout=TOKENIZE_TIMEOUT_S):
+        return _heuristic_token_estimate(text)
+
     tokenize_url = f"{_ollama_base_url()}/api/tokenize"
     try:
-        resp = requests.post(
+        resp = get_http_session().post(
             tokenize_url,
             json={"model": LLM_MODEL_NAME, "content": text},
             timeout=TOKENIZE_TIMEOUT_S,
@@ -264,3 +348,5 @@ def count_text_tokens(text: str) -> int:
         n = _heuristic_token_estimate(text)
         _cache_put(cache, key, n)
         return n
+    finally:
+        _TOKENIZE_SLOTS.release()
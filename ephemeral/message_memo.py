@@ -0,0 +1,41 @@
+"""
+Per-message memoization for stored chat history.
+
+Stored messages are append-only: once a message dict is in st.session_state.messages its
+content is never edited. History changes only by appending a message, popping the newest
+one, or being replaced wholesale on New Chat. Values derived from a message (export text,
+payload form, size stats) are therefore memoized on the message dict itself, under one
+private key, and reused on later reruns.
+
+Any code path that drops or changes a stored message must call forget_message_memos()
+(or pop_message()) so no stale derived value survives.
+"""
+
+from typing import Callable, Hashable, List, TypeVar
+
+T = TypeVar("T")
+
+_MEMO_KEY = "_memo"
+
+
+def message_memo(msg: dict, key: Hashable, compute: Callable[[dict], T]) -> T:
+    """Return compute(msg), computed once per message and key."""
+    memos = msg.get(_MEMO_KEY)
+    if memos is None:
+        memos = msg[_MEMO_KEY] = {}
+    if key in memos:
+        return memos[key]
+    value = memos[key] = compute(msg)
+    return value
+
+
+def forget_message_memos(msg: dict) -> None:
+    """Drop every value memoized on msg; required before editing a stored message."""
+    msg.pop(_MEMO_KEY, None)
+
+
+def pop_message(messages: List[dict]) -> dict:
+    """Remove and return the newest message together with its memoized values."""
+    msg = messages.pop()
+    forget_message_memos(msg)
+    return msg
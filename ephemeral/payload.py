@@ -0,0 +1,126 @@
+import binascii
+from typing import Callable, Dict, List
+
+from ephemeral.message_memo import message_memo
+
+
+def _image_data_url(part: dict) -> str:
+    """
+    Return the base64 data URL for a stored image part.
+
+    Encoded on demand for each request and never stored: session state keeps only the
+    raw bytes, so a conversation never holds both raw and encoded copies of an image.
+    """
+    img_bytes = part.get("data") or b""
+    mime = part.get("mime_type", "image/jpeg")
+    img_b64 = part.get("b64") or binascii.b2a_base64(img_bytes, newline=False).decode("ascii")
+    return f"data:{mime};base64,{img_b64}"
+
+
+def _text_part_to_api(part: dict) -> dict:
+    return {"type": "text", "text": part.get("text", "")}
+
+
+def _image_part_to_api(part: dict) -> dict:
+    return {"type": "image_url", "image_url": {"url": _image_data_url(part)}}
+
+
+def _image_url_part_to_api(part: dict) -> dict:
+    # Rebuild the part so stored UI-only keys (filename, size) stay out of the request.
+    return {"type": "image_url", "image_url": part["image_url"]}
+
+
+_IMAGE_PART_TYPES = frozenset({"image", "image_url"})
+
+# Per-type part converters; image parts are only sent to vision-capable models.
+_TEXT_CONVERTERS: Dict[str, Callable[[dict], dict]] = {
+    "text": _text_part_to_api,
+}
+_VISION_CONVERTERS: Dict[str, Callable[[dict], dict]] = {
+    **_TEXT_CONVERTERS,
+    "image": _image_part_to_api,
+    "image_url": _image_url_part_to_api,
+}
+
+
+def message_to_api(msg: dict, vision_supported: bool) -> dict:
+    """Convert one stored chat message into its OpenAI-compatible payload form."""
+    content = msg["content"]
+    if not isinstance(content, list):
+        return {"role": msg["role"], "content": content}
+
+    converters = _VISION_CONVERTERS if vision_supported else _TEXT_CONVERTERS
+    api_parts: List[dict] = []
+    for part in content:
+        convert = converters.get(part.get("type"))
+        if convert is not None:
+            api_parts.append(convert(part))
+
+    # Some backends/models are stricter about content arrays:
+    # - If all parts are text, send a plain string.
+    # - If no parts remain, send a text placeholder instead of an empty array.
+    if not api_parts:
+        return {"role": msg["role"], "content": "(Attachment omitted.)"}
+
+    if all(part.get("type") == "text" for part in api_parts):
+        combined_text = "\n\n".join(part.get("text", "") for part in api_parts).strip()
+        return {"role": msg["role"], "content": combined_text or "(Attachment omitted.)"}
+
+    return {"role": msg["role"], "content": api_parts}
+
+
+def _has_image_parts(msg: dict) -> bool:
+    content = msg.get("content")
+    return isinstance(content, list) and any(part.get("type") in _IMAGE_PART_TYPES for part in content)
+
+
+def cached_message_to_api(msg: dict, vision_supported: bool) -> dict:
+    """
+    Return the payload form of a stored message, converting text-only results at most once.
+
+    The converted form is memoized per vision setting, since that changes which parts are
+    sent. Results that carry images are rebuilt per request instead, so their encoded data
+    URLs are not kept alongside the raw bytes.
+    """
+    if vision_supported and _has_image_parts(msg):
+        return message_to_api(msg, vision_supported)
+    return message_memo(msg, ("api", vision_supported), lambda m: message_to_api(m, vision_supported))
+
+
+def session_api_messages(messages: List[dict], vision_supported: bool, cache: dict) -> List[dict]:
+    """
+    Return payload forms for the whole history, converting only messages appended since last call.
+
+    `cache` is a session-scoped dict holding the converted list and the last message it
+    covers. Under the message_memo history rules the cached prefix is still valid when
+    that message is at the same position; otherwise (or when vision support flips) the
+    list is rebuilt. Messages that carry images are cached as None and
+    re-encoded into the returned list on each call, so no data URL outlives its request.
+    """
+    api = cache.get("api")
+    count = len(api) if api is not None else 0
+    valid = (
+        api is not None
+        and cache.get("vision") == vision_supported
+        and count <= len(messages)
+        and (count == 0 or messages[count - 1] is cache.get("last"))
+    )
+    if not valid:
+        api, count = [], 0
+        cache["api"] = api
+        cache["vision"] = vision_supported
+
+    converted: Dict[int, dict] = {}
+    for i in range(count, len(messages)):
+        api_msg = cached_message_to_api(messages[i], vision_supported)
+        if isinstance(api_msg["content"], list):
+            converted[i] = api_msg
+            api_msg = None
+        api.append(api_msg)
+    cache["last"] = messages[-1] if messages else None
+    return [
+        api_msg
+        if api_msg is not None
+        else converted.get(i) or message_to_api(messages[i], vision_supported)
+        for i, api_msg in enumerate(api)
+    ]
@@ -72,7 +72,11 @@ class ThinkStreamFilter:
         return ""
 
 
+_RE_CHANNEL_THOUGHT = re.compile(r"<\|channel>thought\n.*?<channel\|>\s*", re.DOTALL)
+_RE_THINK = re.compile(r"<think>.*?</think>\s*", re.DOTALL)
+
+
 def strip_think_blocks(text: str) -> str:
-    text = re.sub(r"<\|channel>thought\n.*?<channel\|>\s*", "", text, flags=re.DOTALL)
-    text = re.sub(r"<think>.*?</think>\s*", "", text, flags=re.DOTALL)
+    text = _RE_CHANNEL_THOUGHT.sub("", text)
+    text = _RE_THINK.sub("", text)
     return text
@@ -1,62 +1,181 @@
 import hashlib
+import json
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
 
 import streamlit as st
-import requests
-from tika import parser
 
-from ephemeral.config import TIKA_CACHE_TTL_S, TIKA_TIMEOUT_S, TIKA_URL
+from ephemeral.config import (
+    MAX_CONCURRENT,
+    TIKA_CACHE_MAX_ENTRIES,
+    TIKA_CACHE_TTL_S,
+    TIKA_MAX_PARALLEL,
+    TIKA_TIMEOUT_S,
+    TIKA_URL,
+)
+from ephemeral.http_session import get_http_session
+from ephemeral.ttl_cache import ttl_memo
 
 
-@st.cache_data(ttl=5, show_spinner=False)
-def tika_alive() -> bool:
-    """Lightweight health check for the Tika server."""
+def probe_tika(session) -> bool:
+    """
+    Uncached Tika health probe using the given session.
+
+    A single HEAD on /tika: any answer below 500 means the server is up, and the short
+    (connect, read) timeout keeps a dead host from stalling the rerun.
+    """
     try:
-        base = TIKA_URL.rstrip("/")
-        endpoints = (f"{base}/tika", f"{base}/version", base)
-        for url in endpoints:
-            r = requests.get(url, timeout=2)
-            if r.ok:
-                return True
-        return False
+        return session.head(f"{TIKA_URL.rstrip('/')}/tika", timeout=(0.5, 1.0)).status_code < 500
     except Exception:
         return False
 
 
+@ttl_memo(5)
+def tika_alive() -> bool:
+    """Lightweight health check for the Tika server."""
+    return probe_tika(get_http_session())
+
+
 # ── Session-scoped Tika parsing cache ─────────────────────────────
-def _get_tika_cache() -> dict:
-    """Return the session-scoped Tika parse cache, creating if needed."""
-    return st.session_state.setdefault("_tika_cache", {})
+def _get_tika_cache() -> OrderedDict:
+    """Return the session-scoped LRU Tika parse cache, creating if needed."""
+    cache = st.session_state.setdefault("_tika_cache", OrderedDict())
 
+    # Migration path for existing sessions that still have a plain dict.
+    if not isinstance(cache, OrderedDict):
+        cache = OrderedDict(cache)
+        st.session_state["_tika_cache"] = cache
 
-def parse_with_tika(data: bytes, filename: str) -> str:
+    return cache
+
+
+def _content_key(data: bytes) -> bytes:
+    """Cache key for document bytes; BLAKE2b is faster than SHA-256 and only needs to disperse well."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# Limits on the /rmeta/text response; exceeding either aborts instead of returning partial text.
+_RMETA_MAX_BYTES = 16 * 1024 * 1024
+_RMETA_MAX_ENTRIES = 256
+
+
+# Shared by every session, so S concurrent uploads still send at most MAX_CONCURRENT parses.
+_TIKA_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+
+class TikaOutputTooLarge(RuntimeError):
+    """The document parsed, but its extracted output exceeds the response limits above."""
+
+
+def _extract_text(session, data: bytes) -> str:
+    """
+    Send document bytes to Tika's recursive /rmeta/text endpoint and return the stripped text.
+
+    Embedded documents (attachments, archive members, OLE objects) come back as extra
+    JSON entries; their X-TIKA:content values are concatenated in order. Errors carry
+    only status/shape details, never the response body. Safe to call from worker threads;
+    at most MAX_CONCURRENT calls talk to Tika at once across the process.
+    """
+    with _TIKA_SLOTS:
+        resp = session.put(
+            f"{TIKA_URL.rstrip('/')}/rmeta/text",
+            data=data,
+            headers={"Accept": "application/json", "Content-Type": "application/octet-stream"},
+            timeout=TIKA_TIMEOUT_S,
+            stream=True,
+        )
+        with resp:
+            if not resp.ok:
+                raise RuntimeError(f"Tika returned HTTP {resp.status_code} {resp.reason}")
+            body = bytearray()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                body += chunk
+                if len(body) > _RMETA_MAX_BYTES:
+                    raise TikaOutputTooLarge("Tika response exceeded the size limit")
+
+    try:
+        payload = json.loads(body)
+    except ValueError as exc:
+        raise RuntimeError("Tika returned invalid JSON") from exc
+
+    if not isinstance(payload, list):
+        raise RuntimeError("Tika returned an unexpected response shape")
+    if len(payload) > _RMETA_MAX_ENTRIES:
+        raise TikaOutputTooLarge("Tika returned too many embedded documents")
+
+    return "".join(
+        entry.get("X-TIKA:content") or "" for entry in payload if isinstance(entry, dict)
+    ).strip()
+
+
+def parse_many_with_tika(items: List[Tuple[bytes, str]]) -> List[Union[str, Exception]]:
     """
-    Parse document bytes with Tika via TIKA_URL.
-    Cached per-session by content hash (SHA-256) with TTL.
+    Parse several (data, filename) documents with Tika, returning results in input order.
+
+    Cache hits are served from the session cache; misses are sent to Tika concurrently
+    because each parse is an independent, I/O-bound HTTP call. A failed parse is
+    returned as its exception instead of raising, so one bad file does not hide the rest.
     """
-    key = hashlib.sha256(data).hexdigest()
     cache = _get_tika_cache()
     now = time.time()
+    results: List[Union[str, Exception, None]] = [None] * len(items)
+    pending: Dict[bytes, List[int]] = {}
+
+    for i, (data, _) in enumerate(items):
+        key = _content_key(data)
+        if key in cache:
+            ts, cached_text = cache[key]
+            if now - ts <= TIKA_CACHE_TTL_S:
+                cache.move_to_end(key)
+                results[i] = cached_text
+                continue
+            del cache[key]
+        # Identical uploads in one batch share a single parse.
+        pending.setdefault(key, []).append(i)
 
-    expired = [k for k, (ts, _) in cache.items() if now - ts > TIKA_CACHE_TTL_S]
-    for k in expired:
-        del cache[k]
+    if pending:
+        if len(pending) == 1:
+            first_index = next(iter(pending.values()))[0]
+            label = f"Reading {items[first_index][1]}…"
+        else:
+            label = f"Reading {len(pending)} documents…"
+        session = get_http_session()
+        with st.spinner(label):
+            with ThreadPoolExecutor(max_workers=min(TIKA_MAX_PARALLEL, len(pending))) as executor:
+                futures = {
+                    key: executor.submit(_extract_text, session, items[indexes[0]][0])
+                    for key, indexes in pending.items()
+                }
+                for key, future in futures.items():
+                    try:
+                        outcome: Union[str, Exception] = future.result()
+                    except Exception as e:
+                        outcome = e
+                    for i in pending[key]:
+                        results[i] = outcome
+                    if isinstance(outcome, str) and outcome:
+                        cache[key] = (now, outcome)
 
-    if key in cache:
-        return cache[key][1]
+        while len(cache) > TIKA_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
 
-    with st.spinner(f"Reading {filename}…"):
-        try:
-            parsed = parser.from_buffer(
-                data,
-                serverEndpoint=TIKA_URL,
-                requestOptions={"timeout": TIKA_TIMEOUT_S},
-            )
-        except TypeError:
-            parsed = parser.from_buffer(data, serverEndpoint=TIKA_URL)
+    # Expire from the least recently used end only; stops at the first live entry, so the
+    # cache is never swept. Expired entries further in are dropped on lookup or by the size cap.
+    while cache and now - next(iter(cache.values()))[0] > TIKA_CACHE_TTL_S:
+        cache.popitem(last=False)
 
-    text = (parsed.get("content") or "").strip()
-    if text:
-        cache[key] = (now, text)
+    return results
 
-    return text
+
+def parse_with_tika(data: bytes, filename: str) -> str:
+    """
+    Parse document bytes with Tika's recursive /rmeta/text endpoint via TIKA_URL.
+    Cached per-session by content hash (BLAKE2b) with TTL, bounded as an LRU.
+    """
+    result = parse_many_with_tika([(data, filename)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
@@ -1,7 +1,53 @@
-from ephemeral.config import TOKEN_HEURISTIC_CHARS_PER_TOKEN
+from typing import List, Tuple
+
+from ephemeral.config import TOKEN_HEURISTIC_CHARS_PER_TOKEN, TOKEN_MAX_CHARS_PER_TOKEN
+from ephemeral.message_memo import message_memo
 
 
 def _heuristic_token_estimate(text: str) -> int:
     if not text:
         return 0
     return max(1, int(len(text) / TOKEN_HEURISTIC_CHARS_PER_TOKEN))
+
+
+def exceeds_token_budget(text: str, budget_tokens: int) -> bool:
+    """
+    True when text cannot fit in budget_tokens even at an optimistic chars-per-token ratio.
+
+    Lets callers drop hopelessly oversized documents without sending them to the tokenizer.
+    """
+    return len(text) > max(0, budget_tokens) * TOKEN_MAX_CHARS_PER_TOKEN
+
+
+def _compute_text_stats(msg: dict) -> Tuple[int, int]:
+    chars = chunks = 0
+    content = msg.get("content", "")
+    if isinstance(content, list):
+        for part in content:
+            if part.get("type") == "text":
+                text = part.get("text")
+                if text:
+                    chars += len(text)
+                    chunks += 1
+    elif content:
+        chars = len(str(content))
+        chunks = 1
+    return chars, chunks
+
+
+def _message_text_stats(msg: dict) -> Tuple[int, int]:
+    """Return (characters, chunks) of a message's text as build_message_text would flatten it."""
+    return message_memo(msg, "text_stats", _compute_text_stats)
+
+
+def history_token_estimate(messages: List[dict]) -> int:
+    """Heuristic token estimate of build_message_text(messages) without re-joining the history."""
+    chars = chunks = 0
+    for msg in messages:
+        msg_chars, msg_chunks = _message_text_stats(msg)
+        chars += msg_chars
+        chunks += msg_chunks
+    if not chars:
+        return 0
+    # Account for the newline separators build_message_text inserts between chunks.
+    return max(1, int((chars + chunks - 1) / TOKEN_HEURISTIC_CHARS_PER_TOKEN))
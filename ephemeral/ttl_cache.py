@@ -0,0 +1,40 @@
+import functools
+import threading
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def ttl_memo(ttl_s: float) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """
+    Memoize a zero-argument function process-wide for ttl_s seconds.
+
+    Unlike st.cache_data, concurrent callers that find the value expired do not each
+    re-run the function: one refreshes it under a lock while the others wait and reuse
+    the fresh result. Intended for cheap-to-return, slow-to-compute backend health checks.
+    The wrapper exposes clear() to drop the memoized value.
+    """
+
+    def decorator(func: Callable[[], T]) -> Callable[[], T]:
+        lock = threading.Lock()
+        state: dict = {}
+
+        @functools.wraps(func)
+        def wrapper() -> T:
+            with lock:
+                if "value" in state and time.monotonic() < state["expires"]:
+                    return state["value"]
+                value = func()
+                state["value"] = value
+                state["expires"] = time.monotonic() + ttl_s
+                return value
+
+        def clear() -> None:
+            with lock:
+                state.clear()
+
+        wrapper.clear = clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -2,16 +2,18 @@ import os
 import base64
 import pathlib
 import string
-import uuid
+import time
+import secrets
 import logging
 import inspect
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from datetime import datetime, tzinfo
+from datetime import datetime, timezone, tzinfo
 from html import escape as html_escape
-from typing import Union, List
+from typing import Dict, Union, List, Tuple
+from zoneinfo import ZoneInfo
 
 import streamlit as st
-import pytz
 from ephemeral.config import (
     APP_VERSION,
     CONTEXT_PREFIX,
@@ -27,23 +29,25 @@ from ephemeral.config import (
     max_tokens_for_turn,
     reasoning_effort_for_turn,
 )
-from ephemeral.export import (
-    build_conversation_html,
-    build_conversation_markdown,
-    build_message_html,
-    build_message_markdown,
-    build_message_text,
+from ephemeral.export import cached_conversation_exports, cached_message_exports
+from ephemeral.attachments import (
+    build_doc_context,
+    decode_plain_text,
+    is_plain_text_upload,
+    prepare_image_for_model,
 )
 from ephemeral.clipboard import render_copy_button, render_turn_copy_button
+from ephemeral.health import backends_alive
+from ephemeral.message_memo import forget_message_memos, pop_message
+from ephemeral.payload import session_api_messages
 from ephemeral.stream_filter import ThinkStreamFilter, strip_think_blocks
-from ephemeral.token_budget import _heuristic_token_estimate
-from ephemeral.tika_client import parse_with_tika, tika_alive
+from ephemeral.token_budget import _heuristic_token_estimate, exceeds_token_budget, history_token_estimate
+from ephemeral.tika_client import TikaOutputTooLarge, parse_many_with_tika, tika_alive
 from ephemeral.llm_client import (
     count_text_tokens,
     get_image_token_cost,
     get_llm_client,
     get_model_ctx,
-    llm_alive,
     model_supports_images,
 )
 
@@ -64,11 +68,20 @@ st.set_page_config(
     },
 )
 
-def load_css(path: str = "theme.css") -> None:
-    """Load optional CSS overrides to customize Streamlit's default look."""
+@st.cache_resource
+def _load_theme_css(path: str = "theme.css") -> str:
+    """Read the stylesheet once per process and return it wrapped in a <style> tag."""
     css_path = pathlib.Path(path)
     if css_path.exists():
-        st.markdown(f"<style>{css_path.read_text()}</style>", unsafe_allow_html=True)
+        return f"<style>{css_path.read_text()}</style>"
+    return ""
+
+
+def load_css(path: str = "theme.css") -> None:
+    """Load optional CSS overrides to customize Streamlit's default look."""
+    css = _load_theme_css(path)
+    if css:
+        st.markdown(css, unsafe_allow_html=True)
 
 
 load_css()
@@ -85,6 +98,8 @@ except ImportError:
 # ── Backend configuration ─────────────────────────────────────────
 DEFAULT_UPLOAD_PROMPT = os.getenv("DEFAULT_UPLOAD_PROMPT", "Please analyze the uploaded files.")
 MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+# Minimum gap between streaming redraws; each redraw re-sends the whole reply to the browser.
+STREAM_RENDER_INTERVAL_S = 0.05
 
 
 def get_local_timezone() -> tzinfo:
@@ -97,7 +112,7 @@ def get_local_timezone() -> tzinfo:
     env_tz = os.getenv("EPHEMERAL_TIMEZONE")
     if env_tz:
         try:
-            return pytz.timezone(env_tz)
+            return ZoneInfo(env_tz)
         except Exception:
             if DEBUG_MODE:
                 try:
@@ -108,19 +123,17 @@ def get_local_timezone() -> tzinfo:
                     pass
 
     sys_tz = datetime.now().astimezone().tzinfo
-    return sys_tz or pytz.UTC
+    return sys_tz or timezone.utc
 
 
 TIMEZONE = get_local_timezone()
+# Windows strftime spells "no zero padding" as %#, POSIX as %-.
+_TS_FMT = "%#I:%M %p on %A, %B %#d, %Y" if os.name == "nt" else "%-I:%M %p on %A, %B %-d, %Y"
 
 
 def timestamp_local() -> str:
     """Return a human-readable local timestamp string."""
-    now = datetime.now(TIMEZONE)
-    fmt = "%-I:%M %p on %A, %B %-d, %Y"
-    if os.name == "nt":
-        fmt = fmt.replace("%-I", "%#I").replace("%-d", "%#d")
-    return now.strftime(fmt)
+    return datetime.now(TIMEZONE).strftime(_TS_FMT)
 
 
 tmpl_path = pathlib.Path(__file__).parent / "system_prompt_template.md"
@@ -135,22 +148,49 @@ else:
         "Answer concisely and accurately based on the context provided."
     )
 
+# Ollama reuses its KV cache for an unchanged prompt prefix, so the system prompt is rendered
+# once and never carries the clock. The time goes in a note after the history instead (see
+# current_time_note()); older custom templates that still use the placeholder point to it.
+SYSTEM_PROMPT = SYSTEM_TMPL.safe_substitute(
+    current_time_local="given in the note after the latest message"
+)
 
-@st.cache_data(show_spinner=False)
+
+def current_time_note() -> dict:
+    """
+    Return this turn's clock as a short system note.
+    It is sent after the history and never stored in messages, so the cached prefix
+    [system, history...] stays byte-identical from turn to turn.
+    """
+    return {"role": "system", "content": f"Current local time: {timestamp_local()}"}
+
+
+@st.cache_resource(show_spinner=False)
 def _load_logo_b64(path: str = "static/ephemeral_logo.png") -> str:
-    """Read and base64-encode the logo once, cached across reruns."""
+    """Read and base64-encode the logo once per process; the immutable string is shared, not copied."""
     logo_path = pathlib.Path(path)
     if logo_path.exists():
         return base64.b64encode(logo_path.read_bytes()).decode("ascii")
     return ""
 
 
+@st.cache_resource
+def _image_prep_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for upload-time image downscaling."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-prep")
+
+
+def new_message_id() -> str:
+    """Return a short random id; ids only need to be unique within one session."""
+    return secrets.token_hex(8)
+
+
 # ── Chat message wrapper for CSS styling ──────────────────────────
 @contextmanager
 def styled_chat_message(role: str, message_id: str = None):
     """Yield a chat_message wrapped in keyed containers for stable role CSS hooks."""
     normalized_role = "user" if role == "user" else "assistant"
-    key = f"{normalized_role}-{message_id}" if message_id else f"{normalized_role}-{uuid.uuid4()}"
+    key = f"{normalized_role}-{message_id}" if message_id else f"{normalized_role}-{new_message_id()}"
     chat_kwargs = {
         "avatar": ":material/account_circle:" if normalized_role == "user" else ":material/assistant:",
     }
@@ -181,19 +221,42 @@ st.session_state.setdefault("show_welcome", True)
 st.session_state.setdefault("last_token_count", 0)
 st.session_state.setdefault("tokenizer_available", None)
 st.session_state.setdefault("_vision_supported", None)
+st.session_state.setdefault("_model_vision_capable", None)
 st.session_state.setdefault("thinking_mode_enabled", False)
 
 
+def conversation_exports(messages: List[dict]) -> Tuple[str, str]:
+    """
+    Return (markdown, html) transcript copy payloads for the sidebar.
+
+    Messages are append-only with unique ids, so (count, last id) identifies the
+    transcript; reruns that add no message reuse the assembled strings.
+    """
+    signature = (len(messages), messages[-1].get("id") if messages else None)
+    cached = st.session_state.get("_export_cache")
+    if cached is None or cached[0] != signature:
+        cached = (signature, *cached_conversation_exports(messages))
+        st.session_state["_export_cache"] = cached
+    return cached[1], cached[2]
+
+
 def reset_chat_session() -> None:
     """Reset conversation-scoped state while preserving app/runtime settings."""
+    for msg in st.session_state.get("messages", []):
+        forget_message_memos(msg)
     st.session_state["messages"] = []
     st.session_state["show_welcome"] = True
     st.session_state["last_token_count"] = 0
     st.session_state["tokenizer_available"] = None
     st.session_state["_vision_supported"] = None
+    st.session_state["_model_vision_capable"] = None
     # Non-thinking remains the default for each new chat.
     st.session_state["thinking_mode_enabled"] = False
     st.session_state.pop("main_chat", None)
+    st.session_state.pop("_export_cache", None)
+    st.session_state.pop("_api_messages_cache", None)
+    st.session_state.pop("_copy_iframe_srcs", None)
+    st.session_state.pop("_last_prompt_cache", None)
 
 # ── Sidebar ───────────────────────────────────────────────────────
 with st.sidebar:
@@ -222,9 +285,10 @@ with st.sidebar:
         )
 
     # Friendly status messages for non-technical users.
-    if not llm_alive():
+    llm_up, tika_up = backends_alive()
+    if not llm_up:
         st.error("The AI service is not available right now. Please try again in a moment.")
-    if not tika_alive():
+    if not tika_up:
         st.info("Document reading is temporarily unavailable. You can still chat, but uploads may not be readable.")
 
     if st.button("New Chat", key="sidebar_new", width="stretch"):
@@ -232,8 +296,7 @@ with st.sidebar:
         st.rerun()
 
     if st.session_state.messages:
-        export_md = build_conversation_markdown(st.session_state.messages)
-        export_html = build_conversation_html(st.session_state.messages)
+        export_md, export_html = conversation_exports(st.session_state.messages)
         render_copy_button(export_md, export_html)
 
     if DEBUG_MODE:
@@ -275,6 +338,16 @@ with st.sidebar:
             else:
                 st.caption("Token counting: not checked yet")
 
+            prompt_cache = st.session_state.get("_last_prompt_cache")
+            if prompt_cache:
+                dbg_cached, dbg_prompt = prompt_cache
+                st.caption(
+                    f"Prompt cache (last turn): {dbg_cached:,} of {dbg_prompt:,} prompt tokens reused "
+                    f"({dbg_cached / dbg_prompt:.0%})"
+                )
+            else:
+                st.caption("Prompt cache (last turn): not reported by backend")
+
 # ── Chat input ───────────────────────────────────────────────────
 prompt_in = st.chat_input(
     "Ask a question or attach files...",
@@ -419,9 +492,8 @@ def _message_has_image(content: Union[str, list]) -> bool:
 for m in st.session_state.messages:
     with styled_chat_message(m["role"], m.get("id")):
         render_content(m["content"])
-        turn_copy_md = build_message_markdown(m)
-        turn_copy_html = build_message_html(m)
-        turn_copy_id = m.get("id") or str(uuid.uuid4())
+        turn_copy_md, turn_copy_html = cached_message_exports(m)
+        turn_copy_id = m.get("id") or new_message_id()
         render_turn_copy_button(turn_copy_md, turn_copy_html, turn_copy_id)
 
 
@@ -443,12 +515,12 @@ if prompt_in is not None:
     if not user_text and not files:
         st.stop()
 
-    user_msg_id = str(uuid.uuid4())
+    user_msg_id = new_message_id()
 
     with styled_chat_message("user", user_msg_id):
         st.markdown(user_text)
 
-    sys_prompt = SYSTEM_TMPL.safe_substitute(current_time_local=timestamp_local())
+    time_note = current_time_note()
 
     has_image_files = any(getattr(f, "type", "").startswith("image/") for f in files)
     has_image_history = any(
@@ -456,7 +528,16 @@ if prompt_in is not None:
     )
 
     if has_image_files or has_image_history:
-        vision_supported = model_supports_images()
+        # The configured model cannot change mid-session, so a definite answer is kept
+        # for the conversation (New Chat clears it); an unreachable backend is re-asked.
+        vision_supported = st.session_state.get("_model_vision_capable")
+        if vision_supported is None:
+            vision_supported = model_supports_images()
+            if vision_supported is None:
+                # /api/show did not answer: send this turn text-only and ask again next turn.
+                vision_supported = False
+            else:
+                st.session_state["_model_vision_capable"] = vision_supported
     else:
         vision_supported = False
 
@@ -477,29 +558,57 @@ if prompt_in is not None:
 
     parts: List[dict] = []
     doc_entries: List[dict] = []
+    doc_results: List[tuple] = []
+    pending_docs: List[tuple] = []
+    image_jobs: List[tuple] = []
     image_count = 0
-
-    tika_ok = tika_alive()
-    has_doc_files = any(not getattr(f, "type", "").startswith("image/") for f in files)
-    if has_doc_files and not tika_ok:
+    # Per-file problems are collected and reported as one notice per kind after the loop.
+    oversized_files: List[tuple] = []
+    unreadable_docs: List[str] = []
+    empty_docs: List[str] = []
+    too_large_docs: List[str] = []
+
+    # Plain-text uploads that are valid UTF-8 are decoded locally; every other document
+    # (including text in another encoding) needs Tika.
+    local_texts: Dict[int, str] = {}
+    for file_idx, f in enumerate(files):
+        ftype = getattr(f, "type", "")
+        if is_plain_text_upload(ftype) and int(getattr(f, "size", 0) or 0) <= MAX_UPLOAD_BYTES:
+            text = decode_plain_text(f.getvalue())
+            if text is not None:
+                local_texts[file_idx] = text
+    needs_tika = any(
+        file_idx not in local_texts and not getattr(f, "type", "").startswith("image/")
+        for file_idx, f in enumerate(files)
+    )
+    tika_ok = tika_alive() if needs_tika else True
+    if needs_tika and not tika_ok:
         st.info(
             "I can’t read documents right now, but I can still answer questions. "
             "If you paste text from the document, I can work with that."
         )
 
-    for f in files:
+    for file_idx, f in enumerate(files):
         ftype = getattr(f, "type", "")
         file_size = int(getattr(f, "size", 0) or 0)
         if file_size > MAX_UPLOAD_BYTES:
-            st.error(
-                f"{f.name} is too large ({file_size / (1024 * 1024):.1f} MB). "
-                "The maximum file size is 50 MB."
-            )
+            oversized_files.append((f.name, file_size / (1024 * 1024)))
             continue
 
         if ftype.startswith("image/"):
-            f.seek(0)
-            img_bytes = f.getvalue()
+            # UploadedFile.getvalue() returns the whole buffer regardless of the cursor.
+            # Oversized images are downscaled once here so session state and every
+            # later request carry the smaller encoding. The work runs on a worker thread
+            # so it overlaps the Tika batch; the part is completed below.
+            image_part = {
+                "type": "image",
+                "data": None,
+                "mime_type": ftype or "image/jpeg",
+                "filename": f.name,
+                "size": file_size,
+            }
+            job = _image_prep_executor().submit(prepare_image_for_model, f.getvalue(), image_part["mime_type"])
+            image_jobs.append((image_part, job))
             parts.append(
                 {
                     "type": "text",
@@ -507,15 +616,7 @@ if prompt_in is not None:
                     "_attachment": {"name": f.name, "size": file_size, "kind": "image"},
                 }
             )
-            parts.append(
-                {
-                    "type": "image",
-                    "data": img_bytes,
-                    "mime_type": ftype or "image/jpeg",
-                    "filename": f.name,
-                    "size": file_size,
-                }
-            )
+            parts.append(image_part)
             image_count += 1
             continue
 
@@ -527,64 +628,117 @@ if prompt_in is not None:
                 "_attachment": {"name": f.name, "size": file_size, "kind": "document"},
             }
         )
-        if not tika_ok:
-            continue
-
-        try:
-            f.seek(0)
-            data = f.getvalue()
-            txt = parse_with_tika(data, f.name)
-
-            if txt:
-                block = f"--- {f.name} ---\n{txt}"
-                doc_entries.append({"name": f.name, "block": block})
+        if file_idx in local_texts:
+            doc_results.append((f.name, local_texts[file_idx]))
+        elif tika_ok:
+            # Placeholder filled from the concurrent Tika batch below.
+            doc_results.append((f.name, None))
+            pending_docs.append((f.getvalue(), f.name))
+
+    # Tika documents are parsed concurrently; all results are reported in upload order.
+    if doc_results:
+        parsed = iter(parse_many_with_tika(pending_docs) if pending_docs else ())
+        for doc_name, result in doc_results:
+            if result is None:
+                result = next(parsed)
+            if isinstance(result, TikaOutputTooLarge):
+                # Parsed fine, but the extracted output is beyond what the app accepts.
+                too_large_docs.append(doc_name)
+            elif isinstance(result, Exception):
+                unreadable_docs.append(doc_name)
+                if DEBUG_MODE:
+                    with st.expander(f"Details: {doc_name}", expanded=False):
+                        st.code(str(result))
+            elif result:
+                doc_entries.append({"name": doc_name, "text": result})
             else:
-                st.info(
-                    f"I couldn’t extract text from {f.name}. "
-                    "If it’s a scanned PDF, try a text-based version or paste the relevant text here."
-                )
-        except Exception as e:
-            st.info(f"I couldn’t read {f.name}. You can try uploading it again, or try a different format.")
-            if DEBUG_MODE:
-                with st.expander(f"Details: {f.name}", expanded=False):
-                    st.code(str(e))
+                empty_docs.append(doc_name)
+
+    if len(oversized_files) == 1:
+        name, size_mb = oversized_files[0]
+        st.error(f"{name} is too large ({size_mb:.1f} MB). The maximum file size is 50 MB.")
+    elif oversized_files:
+        listed = ", ".join(f"{name} ({size_mb:.1f} MB)" for name, size_mb in oversized_files)
+        st.error(f"These files are too large: {listed}. The maximum file size is 50 MB.")
+    if len(unreadable_docs) == 1:
+        st.info(f"I couldn’t read {unreadable_docs[0]}. You can try uploading it again, or try a different format.")
+    elif unreadable_docs:
+        st.info(
+            f"I couldn’t read these files: {', '.join(unreadable_docs)}. "
+            "You can try uploading them again, or try a different format."
+        )
+    if len(empty_docs) == 1:
+        st.info(
+            f"I couldn’t extract text from {empty_docs[0]}. "
+            "If it’s a scanned PDF, try a text-based version or paste the relevant text here."
+        )
+    elif empty_docs:
+        st.info(
+            f"I couldn’t extract text from these files: {', '.join(empty_docs)}. "
+            "If they’re scanned PDFs, try text-based versions or paste the relevant text here."
+        )
+    if len(too_large_docs) == 1:
+        st.info(
+            f"{too_large_docs[0]} contains more text than I can take in at once, so I left it out. "
+            "Try splitting it into smaller files or pasting the relevant section here."
+        )
+    elif too_large_docs:
+        st.info(
+            f"These files contain more text than I can take in at once, so I left them out: "
+            f"{', '.join(too_large_docs)}. Try splitting them into smaller files or pasting the relevant sections here."
+        )
 
-    def compute_pending_text(entries: List[dict]) -> str:
-        """
-        Pending text used for context budgeting.
-        Intentionally ignores filename markers to avoid estimation drift and stale marker bugs.
-        """
-        chunks: List[str] = []
-        if entries:
-            doc_blocks = "\n\n".join(entry["block"] for entry in entries)
-            chunks.append(CONTEXT_PREFIX + doc_blocks)
-        if user_text:
-            chunks.append(user_text)
-        return "\n\n".join(chunks).strip()
-
-    def estimate_pending_cost(entries: List[dict]) -> int:
-        pending_text = compute_pending_text(entries)
-        text_tokens = count_text_tokens(pending_text)
-        image_tokens = (image_count * image_token_cost) if vision_supported else 0
-        return text_tokens + image_tokens
+    # Complete image parts once their downscaling (overlapped with the Tika batch) is done.
+    for image_part, job in image_jobs:
+        image_part["data"], image_part["mime_type"] = job.result()
 
     # Base tokens:
     # - If we have last_token_count from the previous turn, use it as baseline (hybrid approach).
     # - Otherwise use a quick heuristic for system + history to keep UI responsive.
     if st.session_state.last_token_count == 0:
-        history_text = build_message_text(st.session_state.messages)
-        base_tokens = _heuristic_token_estimate(sys_prompt) + _heuristic_token_estimate(history_text)
+        base_tokens = (
+            _heuristic_token_estimate(SYSTEM_PROMPT)
+            + _heuristic_token_estimate(time_note["content"])
+            + history_token_estimate(st.session_state.messages)
+        )
     else:
         base_tokens = int(st.session_state.last_token_count)
 
-    pending_tokens = estimate_pending_cost(doc_entries)
+    # Documents far larger than the remaining context can never fit; drop them (disclosed
+    # below with the other omitted attachments) before tokenizing anything.
+    doc_budget = max_ctx - base_tokens
+    skipped_docs: List[str] = [
+        entry["name"] for entry in doc_entries if exceeds_token_budget(entry["text"], doc_budget)
+    ]
+    if skipped_docs:
+        doc_entries = [entry for entry in doc_entries if not exceeds_token_budget(entry["text"], doc_budget)]
+
+    # Pending cost is tokenized piecewise: the user's text, the context header and each
+    # document block once. Dropping documents below is then arithmetic on these counts
+    # rather than re-tokenizing the whole remaining context on every pass. Filename markers
+    # are intentionally ignored to avoid estimation drift and stale marker bugs.
+    pending_tokens = count_text_tokens(user_text.strip())
+    if vision_supported:
+        pending_tokens += image_count * image_token_cost
+    if doc_entries and base_tokens + pending_tokens > max_ctx:
+        # Over budget before any document is added: dropping documents cannot help, so
+        # skip them all without tokenizing; the oversized-request path below handles it.
+        skipped_docs.extend(entry["name"] for entry in doc_entries)
+        doc_entries = []
+    context_header_tokens = count_text_tokens(CONTEXT_PREFIX) if doc_entries else 0
+    pending_tokens += context_header_tokens
+    for entry in doc_entries:
+        # +1 covers the blank-line separator between blocks in build_doc_context.
+        entry["tokens"] = count_text_tokens(f"--- {entry['name']} ---\n{entry['text']}") + 1
+        pending_tokens += entry["tokens"]
     prompt_token_estimate = base_tokens + pending_tokens
 
-    skipped_docs: List[str] = []
     while doc_entries and prompt_token_estimate > max_ctx:
         dropped = doc_entries.pop()
         skipped_docs.append(dropped["name"])
-        pending_tokens = estimate_pending_cost(doc_entries)
+        pending_tokens -= dropped["tokens"]
+        if not doc_entries:
+            pending_tokens -= context_header_tokens
         prompt_token_estimate = base_tokens + pending_tokens
 
     # Ghost doc cleanup: remove dropped doc markers from parts
@@ -601,13 +755,12 @@ if prompt_in is not None:
         ]
 
     # Build synthetic doc context
-    doc_ctx_blocks: List[str] = [entry["block"] for entry in doc_entries]
-    if doc_ctx_blocks:
+    if doc_entries:
         parts.insert(
             0,
             {
                 "type": "text",
-                "text": CONTEXT_PREFIX + "\n\n".join(doc_ctx_blocks),
+                "text": build_doc_context(doc_entries),
                 "_synthetic": True,
             },
         )
@@ -635,9 +788,9 @@ if prompt_in is not None:
         if st.session_state.messages:
             last_msg = st.session_state.messages[-1]
             if last_msg.get("role") == "user" and last_msg.get("id") == user_msg_id:
-                st.session_state.messages.pop()
+                pop_message(st.session_state.messages)
 
-        assistant_msg_id = str(uuid.uuid4())
+        assistant_msg_id = new_message_id()
         error_text = (
             "That request is too large for this AI model right now, so I omitted that oversized request "
             "from conversation history to keep this session usable. "
@@ -667,51 +820,16 @@ if prompt_in is not None:
             "starting a new conversation usually helps."
         )
 
-    # Convert stored messages to OpenAI-compatible payload
-    messages_for_api: List[dict] = []
-    for msg in st.session_state.messages:
-        if isinstance(msg["content"], list):
-            api_parts: List[dict] = []
-            for part in msg["content"]:
-                ptype = part.get("type")
-
-                if ptype == "text":
-                    api_parts.append({"type": "text", "text": part.get("text", "")})
-
-                elif ptype == "image":
-                    if vision_supported:
-                        img_bytes = part.get("data") or b""
-                        img_b64 = part.get("b64")
-                        if not img_b64:
-                            img_b64 = base64.b64encode(img_bytes).decode()
-                        mime = part.get("mime_type", "image/jpeg")
-                        api_parts.append(
-                            {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{img_b64}"}}
-                        )
-
-                elif ptype == "image_url":
-                    if vision_supported:
-                        api_parts.append(part)
-
-            # Some backends/models are stricter about content arrays:
-            # - If all parts are text, send a plain string.
-            # - If no parts remain, send a text placeholder instead of an empty array.
-            if not api_parts:
-                messages_for_api.append({"role": msg["role"], "content": "(Attachment omitted.)"})
-                continue
-
-            if all(part.get("type") == "text" for part in api_parts):
-                combined_text = "\n\n".join(part.get("text", "") for part in api_parts).strip()
-                messages_for_api.append({"role": msg["role"], "content": combined_text or "(Attachment omitted.)"})
-                continue
-
-            messages_for_api.append({"role": msg["role"], "content": api_parts})
-        else:
-            messages_for_api.append({"role": msg["role"], "content": msg["content"]})
+    # Convert stored messages to OpenAI-compatible payload; only new turns are converted.
+    messages_for_api = session_api_messages(
+        st.session_state.messages,
+        vision_supported,
+        st.session_state.setdefault("_api_messages_cache", {}),
+    )
 
-    payload = [{"role": "system", "content": sys_prompt}, *messages_for_api]
+    payload = [{"role": "system", "content": SYSTEM_PROMPT}, *messages_for_api, time_note]
 
-    assistant_msg_id = str(uuid.uuid4())
+    assistant_msg_id = new_message_id()
 
     with styled_chat_message("assistant", assistant_msg_id):
         with st.spinner("Generating…"):
@@ -744,8 +862,9 @@ if prompt_in is not None:
                     else:
                         raise
 
-                acc = ""
+                chunks: List[str] = []
                 box = st.empty()
+                last_render = 0.0
                 used_usage_from_backend = False
                 stream_filter = ThinkStreamFilter()
 
@@ -756,26 +875,38 @@ if prompt_in is not None:
                         if not delta and LLM_SHOW_REASONING:
                             delta = getattr(delta_obj, "reasoning", None)
                         if delta:
-                            acc += stream_filter.process_chunk(delta)
-                            box.markdown(acc + "▌")
+                            visible = stream_filter.process_chunk(delta)
+                            if visible:
+                                chunks.append(visible)
+                            now = time.monotonic()
+                            if now - last_render >= STREAM_RENDER_INTERVAL_S:
+                                box.markdown("".join(chunks) + "▌")
+                                last_render = now
 
                     usage = getattr(chunk, "usage", None)
                     if usage and getattr(usage, "total_tokens", None) is not None:
                         st.session_state.last_token_count = int(usage.total_tokens)
                         used_usage_from_backend = True
+                        # Diagnostics only: a reused prefix still occupies the context window,
+                        # so cached tokens never reduce the budget.
+                        details = getattr(usage, "prompt_tokens_details", None)
+                        cached_tokens = getattr(details, "cached_tokens", None)
+                        prompt_tokens = getattr(usage, "prompt_tokens", None)
+                        if cached_tokens is not None and prompt_tokens:
+                            st.session_state["_last_prompt_cache"] = (int(cached_tokens), int(prompt_tokens))
 
                 if stream_filter.in_think_block and DEBUG_MODE:
                     logging.debug("Unclosed think block detected at end of stream.")
 
                 tail = stream_filter.finalize()
                 if tail:
-                    acc += tail
+                    chunks.append(tail)
                 elif stream_filter.in_think_block and DEBUG_MODE:
                     logging.debug(
                         "Discarding trailing stream buffer because stream ended inside a think block."
                     )
 
-                acc = strip_think_blocks(acc)
+                acc = strip_think_blocks("".join(chunks))
                 box.markdown(acc)
 
                 # If backend didn't provide usage totals, keep hybrid behavior with a fast estimate.
@@ -800,7 +931,7 @@ if prompt_in is not None:
                     if st.session_state.messages:
                         last_msg = st.session_state.messages[-1]
                         if last_msg.get("role") == "user" and last_msg.get("id") == user_msg_id:
-                            st.session_state.messages.pop()
+                            pop_message(st.session_state.messages)
                     st.error(
                         "That message is too long for this AI model. "
                         "I omitted that oversized request from conversation history to keep this session usable. "
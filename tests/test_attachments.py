@@ -0,0 +1,102 @@
+import io
+
+from PIL import Image
+
+from ephemeral import attachments
+
+
+def _png_bytes(size, mode="RGB", color=(10, 20, 30)):
+    buf = io.BytesIO()
+    Image.new(mode, size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_small_image_is_returned_unchanged():
+    data = _png_bytes((32, 16))
+    assert attachments.prepare_image_for_model(data, "image/png") == (data, "image/png")
+
+
+def test_large_image_is_downscaled_to_jpeg():
+    edge = attachments.IMAGE_MAX_EDGE_PX
+    data = _png_bytes((edge * 2, edge))
+
+    out, mime = attachments.prepare_image_for_model(data, "image/png")
+
+    assert mime == "image/jpeg"
+    with Image.open(io.BytesIO(out)) as img:
+        assert img.format == "JPEG"
+        assert max(img.size) == edge
+
+
+def test_large_transparent_image_is_flattened_onto_white():
+    edge = attachments.IMAGE_MAX_EDGE_PX
+    data = _png_bytes((edge + 10, edge + 10), mode="RGBA", color=(0, 0, 0, 0))
+
+    out, _ = attachments.prepare_image_for_model(data, "image/png")
+
+    with Image.open(io.BytesIO(out)) as img:
+        r, g, b = img.getpixel((5, 5))
+        assert min(r, g, b) > 240
+
+
+def test_image_over_pixel_budget_is_returned_unchanged(monkeypatch):
+    edge = attachments.IMAGE_MAX_EDGE_PX
+    data = _png_bytes((edge * 2, edge))
+    monkeypatch.setattr(attachments, "IMAGE_MAX_PIXELS", edge * edge)
+
+    assert attachments.prepare_image_for_model(data, "image/png") == (data, "image/png")
+
+
+def test_decompression_bomb_warning_returns_image_unchanged(monkeypatch):
+    edge = attachments.IMAGE_MAX_EDGE_PX
+    data = _png_bytes((edge * 2, edge))
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", edge * edge)
+
+    assert attachments.prepare_image_for_model(data, "image/png") == (data, "image/png")
+
+
+def test_exif_rotation_is_applied_after_downscaling():
+    edge = attachments.IMAGE_MAX_EDGE_PX
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90° clockwise on display
+    buf = io.BytesIO()
+    Image.new("RGB", (edge * 2, edge)).save(buf, "JPEG", exif=exif)
+
+    out, _ = attachments.prepare_image_for_model(buf.getvalue(), "image/jpeg")
+
+    with Image.open(io.BytesIO(out)) as img:
+        assert img.size == (edge // 2, edge)
+
+
+def test_undecodable_bytes_are_returned_unchanged():
+    data = b"not an image"
+    assert attachments.prepare_image_for_model(data, "image/webp") == (data, "image/webp")
+
+
+def test_build_doc_context_matches_block_layout():
+    entries = [{"name": "a.pdf", "text": "alpha"}, {"name": "b.txt", "text": "beta"}]
+
+    assert attachments.build_doc_context(entries) == (
+        attachments.CONTEXT_PREFIX + "--- a.pdf ---\nalpha\n\n--- b.txt ---\nbeta"
+    )
+    assert attachments.build_doc_context([]) == ""
+
+
+def test_plain_text_upload_detection():
+    assert attachments.is_plain_text_upload("text/plain")
+    assert attachments.is_plain_text_upload("text/csv")
+    assert attachments.is_plain_text_upload("text/markdown")
+    assert attachments.is_plain_text_upload("application/json")
+    assert attachments.is_plain_text_upload("text/plain; charset=utf-8")
+    assert not attachments.is_plain_text_upload("text/html")
+    assert not attachments.is_plain_text_upload("text/rtf")
+    assert not attachments.is_plain_text_upload("text/xml")
+    assert not attachments.is_plain_text_upload("application/pdf")
+    assert not attachments.is_plain_text_upload("")
+
+
+def test_decode_plain_text_drops_bom_and_defers_other_encodings_to_tika():
+    assert attachments.decode_plain_text(b"\xef\xbb\xbfhello\n") == "hello"
+    assert attachments.decode_plain_text("café ok".encode("utf-8")) == "café ok"
+    assert attachments.decode_plain_text(b"caf\xe9 ok") is None
+    assert attachments.decode_plain_text("hello".encode("utf-16")) is None
@@ -18,7 +18,7 @@ def _capture_rendered_html(monkeypatch, render_call):
         captured["src"] = src
         captured["kwargs"] = kwargs
 
-    monkeypatch.setattr(clipboard, "st", SimpleNamespace(iframe=fake_iframe))
+    monkeypatch.setattr(clipboard, "st", SimpleNamespace(iframe=fake_iframe, session_state={}))
 
     render_call(clipboard)
 
@@ -71,6 +71,24 @@ def test_clipboard_cascade_is_present(monkeypatch):
     assert "copyPlain" in html
 
 
+def test_copy_iframe_src_is_reused_until_payload_changes(monkeypatch):
+    from ephemeral import clipboard
+
+    srcs = []
+    fake_st = SimpleNamespace(iframe=lambda src, **kwargs: srcs.append(src), session_state={})
+    monkeypatch.setattr(clipboard, "st", fake_st)
+
+    clipboard.render_turn_copy_button("plain", "<p>rich</p>", "msg-1")
+    monkeypatch.setattr(clipboard, "_COPY_IFRAME_TEMPLATE", "unused {missing}")
+    clipboard.render_turn_copy_button("plain", "<p>rich</p>", "msg-1")
+    assert srcs[0] == srcs[1]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(clipboard, "st", fake_st)
+    clipboard.render_turn_copy_button("plain", "<p>changed</p>", "msg-1")
+    assert "changed" in _decode_iframe_src(srcs[2])
+
+
 def test_legacy_streamlit_components_iframe_is_not_used():
     from pathlib import Path
 
@@ -5,6 +5,8 @@ from ephemeral.export import (
     build_conversation_markdown,
     build_message_html,
     build_message_markdown,
+    cached_conversation_exports,
+    cached_message_exports,
 )
 
 
@@ -128,3 +130,39 @@ def test_md_to_html_basic_preserves_nested_bullets():
     assert "<li>Parent\n<ul>" in html
     assert "<li>Child A\n</li>" in html
     assert "<li>Child B\n</li>" in html
+
+
+def test_md_to_html_basic_plain_prose_paragraphs():
+    md = "  first line with *em*\nsecond <line>\n\n\nnext paragraph  \n"
+
+    assert _md_to_html_basic(md) == (
+        "<p>first line with <em>em</em><br>second &lt;line&gt;</p>\n<p>next paragraph</p>"
+    )
+    assert _md_to_html_basic(" \n\t\n") == ""
+
+
+def test_cached_message_exports_builds_once():
+    message = {"role": "user", "content": "hello **world**"}
+
+    md, html = cached_message_exports(message)
+    assert md == build_message_markdown(message)
+    assert html == build_message_html(message)
+
+    message["content"] = "changed"
+    assert cached_message_exports(message) == (md, html)
+
+
+def test_cached_conversation_exports_match_full_builders():
+    messages = [
+        {"role": "user", "content": [{"type": "text", "text": "📄 *a.pdf*"}, {"type": "text", "text": "hi"}]},
+        {"role": "assistant", "content": "# Title\n\n- one\n- two"},
+    ]
+    expected = (build_conversation_markdown(messages), build_conversation_html(messages))
+    assert cached_conversation_exports(messages) == expected
+
+    messages.append({"role": "user", "content": "follow-up"})
+    assert cached_conversation_exports(messages) == (
+        build_conversation_markdown(messages),
+        build_conversation_html(messages),
+    )
+    assert cached_conversation_exports([]) == (build_conversation_markdown([]), build_conversation_html([]))
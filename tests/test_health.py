@@ -0,0 +1,20 @@
+def test_backends_alive_runs_both_probes_with_shared_session(monkeypatch):
+    from ephemeral import health
+
+    session = object()
+    seen = []
+
+    def fake_llm(s):
+        seen.append(("llm", s))
+        return True
+
+    def fake_tika(s):
+        seen.append(("tika", s))
+        return False
+
+    monkeypatch.setattr(health, "get_http_session", lambda: session)
+    monkeypatch.setattr(health, "probe_llm", fake_llm)
+    monkeypatch.setattr(health, "probe_tika", fake_tika)
+
+    assert health.backends_alive.__wrapped__() == (True, False)
+    assert sorted(seen, key=lambda item: item[0]) == [("llm", session), ("tika", session)]
@@ -0,0 +1,13 @@
+from requests.adapters import HTTPAdapter
+
+
+def test_http_session_is_shared_and_pooled():
+    from ephemeral.http_session import get_http_session
+
+    session = get_http_session()
+    assert get_http_session() is session
+
+    for prefix in ("http://", "https://"):
+        adapter = session.get_adapter(prefix + "ollama:11434")
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter._pool_maxsize == 16
@@ -4,7 +4,7 @@ from types import SimpleNamespace
 
 
 def _token_key(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+    return hashlib.blake2b(text.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
 
 
 def test_cache_eviction_is_partial_not_total():
@@ -41,15 +41,16 @@ def test_count_text_tokens_cache_hit_promotes_entry(monkeypatch):
     """count_text_tokens should promote a cache hit to most-recently-used."""
     from ephemeral import llm_client
 
-    key_a = _token_key("a")
-    key_b = _token_key("b")
+    text_a = "a" * 100
+    key_a = _token_key(text_a)
+    key_b = _token_key("b" * 100)
     session = {
         "_token_count_cache": OrderedDict([(key_a, 1), (key_b, 2)]),
         "tokenizer_available": False,
     }
     monkeypatch.setattr(llm_client, "st", SimpleNamespace(session_state=session))
 
-    assert llm_client.count_text_tokens("a") == 1
+    assert llm_client.count_text_tokens(text_a) == 1
     assert list(session["_token_count_cache"].keys()) == [key_b, key_a]
 
 
@@ -72,8 +73,168 @@ def test_unrecognized_tokenizer_payload_marks_tokenizer_unavailable(monkeypatch)
     }
     monkeypatch.setattr(llm_client, "st", SimpleNamespace(session_state=session))
     monkeypatch.setattr(llm_client, "ENABLE_TOKEN_BUDGETING", True)
-    monkeypatch.setattr(llm_client.requests, "post", lambda *args, **kwargs: FakeResponse())
-
-    expected = llm_client._heuristic_token_estimate("hello")
-    assert llm_client.count_text_tokens("hello") == expected
+    monkeypatch.setattr(
+        llm_client,
+        "get_http_session",
+        lambda: SimpleNamespace(post=lambda *args, **kwargs: FakeResponse()),
+    )
+
+    text = "hello " * 20
+    expected = llm_client._heuristic_token_estimate(text)
+    assert llm_client.count_text_tokens(text) == expected
     assert session["tokenizer_available"] is False
+
+
+def test_tokenize_calls_are_limited_across_sessions(monkeypatch):
+    """Concurrent count_text_tokens calls share the process-wide tokenize slots."""
+    import threading
+    import time
+
+    from ephemeral import llm_client
+
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    class FakeResponse:
+        status_code = 200
+
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"tokens": [1, 2, 3]}
+
+    def slow_post(*args, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return FakeResponse()
+
+    session = {"_token_count_cache": OrderedDict(), "tokenizer_available": None}
+    monkeypatch.setattr(llm_client, "st", SimpleNamespace(session_state=session))
+    monkeypatch.setattr(llm_client, "ENABLE_TOKEN_BUDGETING", True)
+    monkeypatch.setattr(llm_client, "_TOKENIZE_SLOTS", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(llm_client, "get_http_session", lambda: SimpleNamespace(post=slow_post))
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(llm_client.count_text_tokens(f"text {i} " * 20)))
+        for i in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [3] * 6
+    assert peak[0] == 2
+
+
+def test_short_text_uses_heuristic_without_tokenizer_or_cache(monkeypatch):
+    """Short strings skip the tokenize round-trip and are not cached."""
+    from ephemeral import llm_client
+
+    def fail_post(*args, **kwargs):
+        raise AssertionError("tokenizer should not be called for short text")
+
+    session = {"_token_count_cache": OrderedDict(), "tokenizer_available": None}
+    monkeypatch.setattr(llm_client, "st", SimpleNamespace(session_state=session))
+    monkeypatch.setattr(llm_client, "ENABLE_TOKEN_BUDGETING", True)
+    monkeypatch.setattr(llm_client, "get_http_session", lambda: SimpleNamespace(post=fail_post))
+
+    assert llm_client.count_text_tokens("thanks") == llm_client._heuristic_token_estimate("thanks")
+    assert not session["_token_count_cache"]
+    assert session["tokenizer_available"] is None
+
+
+def test_ollama_show_keeps_only_used_fields(monkeypatch):
+    """_ollama_show should drop large unused fields before they are cached."""
+    from ephemeral import llm_client
+
+    class FakeResponse:
+        ok = True
+
+        def json(self):
+            return {
+                "capabilities": ["completion", "vision"],
+                "model_info": {"general.context_length": 8192},
+                "parameters": "num_ctx 4096",
+                "license": "x" * 10_000,
+                "modelfile": "FROM model",
+            }
+
+    fake_session = SimpleNamespace(post=lambda *args, **kwargs: FakeResponse())
+    monkeypatch.setattr(llm_client, "get_http_session", lambda: fake_session)
+
+    payload = llm_client._ollama_show()
+    assert set(payload) == {"capabilities", "model_info", "parameters"}
+
+
+def test_parse_model_meta_folds_show_payload():
+    """Vision, context and image cost come out of one /api/show payload."""
+    from ephemeral import llm_client
+
+    meta = llm_client._parse_model_meta(
+        {
+            "capabilities": ["completion"],
+            "model_info": {
+                "gemma3.context_length": "bad",
+                "llama.context_length": 8192,
+                "gemma3.vision.block_count": 27,
+                "gemma3.mm.tokens_per_image": "256",
+            },
+        }
+    )
+    assert meta == llm_client._ModelMeta(known=True, supports_vision=True, ctx=8192, img_tokens=256)
+
+    meta = llm_client._parse_model_meta({"parameters": "num_ctx 4096", "model_info": {"context_length": 2048}})
+    assert meta == llm_client._ModelMeta(known=True, supports_vision=False, ctx=4096)
+
+    assert llm_client._parse_model_meta(None) == llm_client._ModelMeta()
+
+
+def test_failed_show_is_unknown_and_only_briefly_memoized(monkeypatch):
+    """A failed /api/show is reported as unknown, held for the short TTL, then re-asked."""
+    from ephemeral import llm_client
+
+    payloads = [None, {"capabilities": ["vision"]}]
+    monkeypatch.setattr(llm_client, "LLM_SUPPORTS_VISION", None)
+    monkeypatch.setattr(llm_client, "LLM_CONTEXT_TOKENS", None)
+    monkeypatch.setattr(llm_client, "_ollama_show", lambda: payloads.pop(0))
+    llm_client._fetched_model_meta.clear()
+    llm_client._cached_model_meta.clear()
+
+    assert llm_client.model_supports_images() is None
+    assert llm_client.get_model_ctx() is None
+    assert len(payloads) == 1
+
+    llm_client._fetched_model_meta.clear()  # the short failure TTL expires
+    assert llm_client.model_supports_images() is True
+    assert llm_client._cached_model_meta().known
+    llm_client._fetched_model_meta.clear()
+    llm_client._cached_model_meta.clear()
+
+
+def testprobe_llm_remembers_the_endpoint_that_answered(monkeypatch):
+    """After a fallback succeeds, the next probe should go straight to that endpoint."""
+    from ephemeral import llm_client
+
+    calls = []
+
+    class FakeSession:
+        def get(self, url, timeout=None):
+            calls.append(url)
+            status = 404 if url == llm_client._MODELS_URL else 200
+            return SimpleNamespace(status_code=status, ok=status == 200)
+
+    monkeypatch.setattr(llm_client, "_last_healthy_url", None)
+
+    assert llm_client.probe_llm(FakeSession()) is True
+    assert calls == [llm_client._MODELS_URL, llm_client._OLLAMA_TAGS_URL]
+
+    calls.clear()
+    assert llm_client.probe_llm(FakeSession()) is True
+    assert calls == [llm_client._OLLAMA_TAGS_URL]
@@ -0,0 +1,29 @@
+from ephemeral.message_memo import forget_message_memos, message_memo, pop_message
+
+
+def test_message_memo_computes_once_per_key():
+    msg = {"role": "user", "content": "hello"}
+    calls = []
+
+    def compute(m):
+        calls.append(m["content"])
+        return len(m["content"])
+
+    assert message_memo(msg, "size", compute) == 5
+    assert message_memo(msg, "size", compute) == 5
+    assert message_memo(msg, ("size", True), compute) == 5
+    assert calls == ["hello", "hello"]
+
+    forget_message_memos(msg)
+    msg["content"] = "hi"
+    assert message_memo(msg, "size", compute) == 2
+
+
+def test_pop_message_drops_memos():
+    history = [{"role": "user", "content": "a"}, {"role": "user", "content": "b"}]
+    message_memo(history[-1], "size", lambda m: 1)
+
+    popped = pop_message(history)
+    assert popped["content"] == "b"
+    assert "_memo" not in popped
+    assert len(history) == 1
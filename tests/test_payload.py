@@ -0,0 +1,111 @@
+import base64
+
+from ephemeral.payload import (
+    cached_message_to_api,
+    message_to_api,
+    session_api_messages,
+)
+
+
+def _image_message():
+    return {
+        "id": "m1",
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "📷 *cat.png*"},
+            {"type": "image", "data": b"\x89PNG", "mime_type": "image/png", "filename": "cat.png"},
+            {"type": "text", "text": "what is this?"},
+        ],
+    }
+
+
+def test_plain_string_content_passes_through():
+    msg = {"role": "assistant", "content": "hello"}
+    assert message_to_api(msg, vision_supported=True) == {"role": "assistant", "content": "hello"}
+
+
+def test_image_parts_become_data_urls_when_vision_supported():
+    api = message_to_api(_image_message(), vision_supported=True)
+
+    image_parts = [p for p in api["content"] if p["type"] == "image_url"]
+    expected = "data:image/png;base64," + base64.b64encode(b"\x89PNG").decode("ascii")
+    assert image_parts == [{"type": "image_url", "image_url": {"url": expected}}]
+
+
+def test_text_only_result_collapses_to_string_without_vision():
+    api = message_to_api(_image_message(), vision_supported=False)
+    assert api == {"role": "user", "content": "📷 *cat.png*\n\nwhat is this?"}
+
+
+def test_empty_parts_use_placeholder():
+    msg = {"role": "user", "content": [{"type": "image", "data": b"x"}]}
+    assert message_to_api(msg, vision_supported=False)["content"] == "(Attachment omitted.)"
+
+
+def test_cached_conversion_reused_until_vision_flips():
+    msg = _image_message()
+
+    first = cached_message_to_api(msg, vision_supported=False)
+    assert cached_message_to_api(msg, vision_supported=False) is first
+
+    flipped = cached_message_to_api(msg, vision_supported=True)
+    assert isinstance(flipped["content"], list)
+
+
+def test_image_bearing_messages_are_not_memoized():
+    msg = _image_message()
+    api = cached_message_to_api(msg, vision_supported=True)
+
+    assert isinstance(api["content"], list)
+    assert "_memo" not in msg
+
+
+def test_stored_image_url_parts_drop_ui_only_keys():
+    url = {"url": "data:image/png;base64,AAAA"}
+    msg = {
+        "role": "user",
+        "content": [
+            {"type": "image_url", "image_url": url, "filename": "cat.png", "size": 3},
+            {"type": "text", "text": "hi"},
+        ],
+    }
+
+    api = message_to_api(msg, vision_supported=True)
+    assert api["content"][0] == {"type": "image_url", "image_url": url}
+
+
+def test_session_api_messages_converts_only_new_turns():
+    cache = {}
+    history = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+
+    first = session_api_messages(history, True, cache)
+    assert [m["content"] for m in first] == ["a", "b"]
+
+    history.append({"role": "user", "content": "c"})
+    second = session_api_messages(history, True, cache)
+    assert second[0] is first[0] and second[1] is first[1]
+    assert [m["content"] for m in second] == ["a", "b", "c"]
+
+
+def test_session_api_messages_does_not_keep_image_data_urls():
+    cache = {}
+    history = [_image_message(), {"role": "assistant", "content": "a cat"}]
+
+    api = session_api_messages(history, True, cache)
+    assert api[0]["content"][1]["image_url"]["url"].startswith("data:image/png;base64,")
+    assert cache["api"][0] is None
+    assert "_memo" not in history[0]
+
+
+def test_session_api_messages_rebuilds_after_pop_or_vision_flip():
+    cache = {}
+    history = [{"role": "user", "content": "a"}, {"role": "user", "content": "big"}]
+    session_api_messages(history, True, cache)
+
+    history.pop()
+    history.append({"role": "assistant", "content": "too large"})
+    assert [m["content"] for m in session_api_messages(history, True, cache)] == ["a", "too large"]
+
+    history[:] = [_image_message()]
+    assert isinstance(session_api_messages(history, True, cache)[0]["content"], list)
+    assert isinstance(session_api_messages(history, False, cache)[0]["content"], str)
@@ -0,0 +1,294 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeSession:
+    def __init__(self, status_code=None):
+        self.status_code = status_code
+        self.calls = []
+
+    def head(self, url, timeout=None):
+        self.calls.append((url, timeout))
+        if self.status_code is None:
+            raise ConnectionError("unreachable")
+        return SimpleNamespace(status_code=self.status_code)
+
+
+@pytest.mark.parametrize("status_code", [200, 405])
+def test_tika_alive_single_head_probe_accepts_non_server_errors(monkeypatch, status_code):
+    from ephemeral import tika_client
+
+    base = tika_client.TIKA_URL.rstrip("/")
+    session = FakeSession(status_code)
+    monkeypatch.setattr(tika_client, "get_http_session", lambda: session)
+
+    assert tika_client.tika_alive.__wrapped__() is True
+    assert session.calls == [(f"{base}/tika", (0.5, 1.0))]
+
+
+@pytest.mark.parametrize("status_code", [503, None])
+def test_tika_alive_false_on_server_error_or_unreachable(monkeypatch, status_code):
+    from ephemeral import tika_client
+
+    session = FakeSession(status_code)
+    monkeypatch.setattr(tika_client, "get_http_session", lambda: session)
+
+    assert tika_client.tika_alive.__wrapped__() is False
+    assert len(session.calls) == 1
+
+
+def _install_fake_tika(monkeypatch, tika_client, session, text="parsed"):
+    calls = []
+
+    def fake_extract_text(http_session, data):
+        calls.append(data)
+        return text
+
+    monkeypatch.setattr(tika_client, "st", SimpleNamespace(session_state=session, spinner=_NullSpinner))
+    monkeypatch.setattr(tika_client, "get_http_session", lambda: None)
+    monkeypatch.setattr(tika_client, "_extract_text", fake_extract_text)
+    return calls
+
+
+class _NullSpinner:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_parse_with_tika_cache_hit_skips_parser_and_promotes(monkeypatch):
+    from ephemeral import tika_client
+
+    session = {}
+    calls = _install_fake_tika(monkeypatch, tika_client, session)
+
+    assert tika_client.parse_with_tika(b"a", "a.pdf") == "parsed"
+    assert tika_client.parse_with_tika(b"b", "b.pdf") == "parsed"
+    key_a, key_b = list(session["_tika_cache"])
+    assert tika_client.parse_with_tika(b"a", "a.pdf") == "parsed"
+
+    assert calls == [b"a", b"b"]
+    assert list(session["_tika_cache"]) == [key_b, key_a]
+
+
+def test_parse_with_tika_cache_is_bounded(monkeypatch):
+    from ephemeral import tika_client
+
+    session = {}
+    _install_fake_tika(monkeypatch, tika_client, session)
+
+    for i in range(tika_client.TIKA_CACHE_MAX_ENTRIES + 5):
+        tika_client.parse_with_tika(str(i).encode(), f"{i}.txt")
+
+    assert len(session["_tika_cache"]) == tika_client.TIKA_CACHE_MAX_ENTRIES
+
+
+def test_parse_with_tika_expired_entry_is_reparsed(monkeypatch):
+    from ephemeral import tika_client
+
+    session = {}
+    calls = _install_fake_tika(monkeypatch, tika_client, session)
+
+    tika_client.parse_with_tika(b"a", "a.pdf")
+    key = next(iter(session["_tika_cache"]))
+    session["_tika_cache"][key] = (0.0, "stale")
+
+    assert tika_client.parse_with_tika(b"a", "a.pdf") == "parsed"
+    assert calls == [b"a", b"a"]
+
+
+def test_parse_with_tika_expires_stale_oldest_entry(monkeypatch):
+    from ephemeral import tika_client
+
+    session = {}
+    _install_fake_tika(monkeypatch, tika_client, session)
+
+    tika_client.parse_with_tika(b"old", "old.pdf")
+    old_key = next(iter(session["_tika_cache"]))
+    session["_tika_cache"][old_key] = (0.0, "stale")
+
+    tika_client.parse_with_tika(b"new", "new.pdf")
+
+    assert old_key not in session["_tika_cache"]
+    assert len(session["_tika_cache"]) == 1
+
+
+def test_parse_with_tika_expires_stale_prefix_up_to_first_live_entry(monkeypatch):
+    from ephemeral import tika_client
+
+    session = {}
+    _install_fake_tika(monkeypatch, tika_client, session)
+
+    for name in (b"a", b"b", b"c"):
+        tika_client.parse_with_tika(name, "doc.pdf")
+    key_a, key_b, key_c = list(session["_tika_cache"])
+    session["_tika_cache"][key_a] = (0.0, "stale")
+    session["_tika_cache"][key_b] = (0.0, "stale")
+
+    tika_client.parse_with_tika(b"d", "doc.pdf")
+
+    cache_keys = list(session["_tika_cache"])
+    assert key_a not in cache_keys and key_b not in cache_keys
+    assert cache_keys[0] == key_c
+    assert len(cache_keys) == 2
+
+
+def test_parse_many_with_tika_keeps_order_and_isolates_failures(monkeypatch):
+    from ephemeral import tika_client
+
+    session = {}
+    _install_fake_tika(monkeypatch, tika_client, session)
+    calls = []
+
+    def fake_extract_text(http_session, data):
+        calls.append(data)
+        if data == b"bad":
+            raise RuntimeError("boom")
+        return data.decode().upper()
+
+    monkeypatch.setattr(tika_client, "_extract_text", fake_extract_text)
+
+    results = tika_client.parse_many_with_tika(
+        [(b"one", "1.pdf"), (b"bad", "2.pdf"), (b"two", "3.pdf"), (b"one", "4.pdf")]
+    )
+
+    assert results[0] == "ONE"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2:] == ["TWO", "ONE"]
+    assert sorted(calls) == [b"bad", b"one", b"two"]
+    assert len(session["_tika_cache"]) == 2
+
+
+class _FakeRmetaResponse:
+    def __init__(self, body=b"", status_code=200, reason="OK"):
+        self.body = body
+        self.status_code = status_code
+        self.reason = reason
+        self.ok = 200 <= status_code < 300
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i : i + chunk_size]
+
+
+class _FakePutSession:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def put(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        return self.response
+
+
+def test_extract_text_concatenates_recursive_rmeta_content():
+    from ephemeral import tika_client
+
+    body = b'[{"X-TIKA:content": "  outer "}, {"Content-Type": "x"}, {"X-TIKA:content": "inner  "}]'
+    session = _FakePutSession(_FakeRmetaResponse(body))
+
+    assert tika_client._extract_text(session, b"doc") == "outer inner"
+    url, kwargs = session.calls[0]
+    assert url.endswith("/rmeta/text")
+    assert kwargs["data"] == b"doc"
+    assert kwargs["headers"]["Accept"] == "application/json"
+
+
+def test_extract_text_errors_do_not_include_response_body():
+    from ephemeral import tika_client
+
+    cases = [
+        (_FakeRmetaResponse(b"secret text", status_code=500, reason="Server Error"), "HTTP 500"),
+        (_FakeRmetaResponse(b"secret text"), "invalid JSON"),
+        (_FakeRmetaResponse(b'{"X-TIKA:content": "secret text"}'), "unexpected response shape"),
+    ]
+    for response, message in cases:
+        with pytest.raises(RuntimeError, match=message) as excinfo:
+            tika_client._extract_text(_FakePutSession(response), b"doc")
+        assert "secret" not in str(excinfo.value)
+
+
+def test_extract_text_over_response_limits_raises_too_large(monkeypatch):
+    from ephemeral import tika_client
+
+    monkeypatch.setattr(tika_client, "_RMETA_MAX_BYTES", 8)
+    with pytest.raises(tika_client.TikaOutputTooLarge):
+        tika_client._extract_text(_FakePutSession(_FakeRmetaResponse(b'[{"X-TIKA:content": "long"}]')), b"doc")
+
+    monkeypatch.setattr(tika_client, "_RMETA_MAX_BYTES", 1024)
+    monkeypatch.setattr(tika_client, "_RMETA_MAX_ENTRIES", 1)
+    with pytest.raises(tika_client.TikaOutputTooLarge):
+        tika_client._extract_text(_FakePutSession(_FakeRmetaResponse(b"[{}, {}]")), b"doc")
+
+
+def test_extract_text_limits_concurrent_parses_across_calls(monkeypatch):
+    import threading
+    import time
+
+    from ephemeral import tika_client
+
+    monkeypatch.setattr(tika_client, "_TIKA_SLOTS", threading.BoundedSemaphore(2))
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    class SlowSession:
+        def put(self, url, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return _FakeRmetaResponse(b'[{"X-TIKA:content": "text"}]')
+
+    # Separate callers (as from separate sessions), each with its own batch.
+    threads = [
+        threading.Thread(target=tika_client._extract_text, args=(SlowSession(), b"doc")) for _ in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+
+
+def test_parse_many_with_tika_bounds_concurrent_parses(monkeypatch):
+    import threading
+    import time
+
+    from ephemeral import tika_client
+
+    session = {}
+    _install_fake_tika(monkeypatch, tika_client, session)
+    monkeypatch.setattr(tika_client, "TIKA_MAX_PARALLEL", 2)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def fake_extract_text(http_session, data):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return "text"
+
+    monkeypatch.setattr(tika_client, "_extract_text", fake_extract_text)
+
+    items = [(str(i).encode(), f"{i}.pdf") for i in range(6)]
+    assert tika_client.parse_many_with_tika(items) == ["text"] * 6
+    assert peak[0] <= 2
@@ -8,3 +8,29 @@ def test_heuristic_token_estimate_ranges():
     short = _heuristic_token_estimate("x" * 20)
     long = _heuristic_token_estimate("x" * 2000)
     assert long > short
+
+
+def test_exceeds_token_budget_only_rejects_hopeless_text():
+    from ephemeral.token_budget import TOKEN_MAX_CHARS_PER_TOKEN, exceeds_token_budget
+
+    assert not exceeds_token_budget("x" * (100 * TOKEN_MAX_CHARS_PER_TOKEN), 100)
+    assert exceeds_token_budget("x" * (100 * TOKEN_MAX_CHARS_PER_TOKEN + 1), 100)
+    assert exceeds_token_budget("x", 0)
+    assert exceeds_token_budget("x", -5)
+
+
+def test_history_token_estimate_matches_flattened_text():
+    from ephemeral.export import build_message_text
+    from ephemeral.token_budget import history_token_estimate
+
+    messages = [
+        {"role": "user", "content": "hello there"},
+        {"role": "assistant", "content": "x" * 97},
+        {"role": "user", "content": [{"type": "text", "text": "abc"}, {"type": "image"}, {"type": "text", "text": ""}]},
+        {"role": "assistant", "content": ""},
+    ]
+    expected = _heuristic_token_estimate(build_message_text(messages))
+    assert history_token_estimate(messages) == expected
+    # Memoized per message; repeated calls give the same answer.
+    assert history_token_estimate(messages) == expected
+    assert history_token_estimate([]) == 0
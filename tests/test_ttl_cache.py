@@ -0,0 +1,43 @@
+import threading
+import time
+
+from ephemeral import ttl_cache
+
+
+def test_ttl_memo_reuses_value_until_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    calls = []
+
+    @ttl_cache.ttl_memo(5)
+    def probe():
+        calls.append(now[0])
+        return len(calls)
+
+    assert probe() == 1
+    now[0] += 4.9
+    assert probe() == 1
+    now[0] += 0.2
+    assert probe() == 2
+
+    probe.clear()
+    assert probe() == 3
+    assert probe.__wrapped__() == 4
+
+
+def test_ttl_memo_concurrent_callers_share_one_refresh():
+    calls = []
+
+    @ttl_cache.ttl_memo(60)
+    def slow_probe():
+        calls.append(1)
+        time.sleep(0.05)
+        return True
+
+    threads = [threading.Thread(target=slow_probe) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
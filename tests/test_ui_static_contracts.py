@@ -98,8 +98,7 @@ def test_ghost_doc_cleanup_uses_attachment_metadata_not_marker_text():
 
 def test_sidebar_logo_encoding_is_cached():
     app_text = (REPO_ROOT / "ephemeral_app.py").read_text(encoding="utf-8")
-    assert "@st.cache_data(show_spinner=False)" in app_text
-    assert "def _load_logo_b64(" in app_text
+    assert "@st.cache_resource(show_spinner=False)\ndef _load_logo_b64(" in app_text
     assert "logo_b64 = _load_logo_b64()" in app_text
 
 
@@ -126,3 +125,11 @@ def test_vision_support_check_uses_current_files_and_history_guard():
     assert '_message_has_image(m.get("content"))' in app_text
     assert "has_image_files or has_image_history" in app_text
     assert "cached_vision" not in app_text
+
+
+def test_clock_is_sent_after_history_not_in_system_prompt():
+    app_source = (REPO_ROOT / "ephemeral_app.py").read_text(encoding="utf-8")
+    template = (REPO_ROOT / "system_prompt_template.md").read_text(encoding="utf-8")
+    assert 'payload = [{"role": "system", "content": SYSTEM_PROMPT}, *messages_for_api, time_note]' in app_source
+    assert "SYSTEM_PROMPT_REFRESH_S" not in app_source
+    assert "${current_time_local}" in template